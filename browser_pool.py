@@ -0,0 +1,71 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+from playwright.sync_api import sync_playwright, Browser, Page
+
+
+class BrowserPool:
+    """One long-lived Chromium per worker thread.
+
+    Sync Playwright objects are bound to the thread that created them, so
+    the pool hands each thread its own browser and reuses it across jobs;
+    every job still gets a fresh, isolated browser context.
+    """
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._launched = 0
+        self._in_use = 0
+
+    def browser(self) -> Browser:
+        """This thread's browser, launched on first use or after a crash"""
+        browser = getattr(self._local, "browser", None)
+        if browser is None or not browser.is_connected():
+            self.close_current()
+            self._local.playwright = sync_playwright().start()
+            self._local.browser = self._local.playwright.chromium.launch(headless=self.headless)
+            with self._lock:
+                self._launched += 1
+        return self._local.browser
+
+    @contextmanager
+    def page(self) -> Iterator[Page]:
+        """A page in a fresh context, closed when the block exits"""
+        context = self.browser().new_context()
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield context.new_page()
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            try:
+                context.close()
+            except Exception as e:
+                print(f"Failed to close browser context: {e}")
+
+    def close_current(self):
+        """Close this thread's browser; call from the thread that owns it"""
+        browser = getattr(self._local, "browser", None)
+        playwright = getattr(self._local, "playwright", None)
+        self._local.browser = None
+        self._local.playwright = None
+        if browser is not None:
+            try:
+                browser.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._launched -= 1
+        if playwright is not None:
+            try:
+                playwright.stop()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        """Launched browsers and how many have a job's page open"""
+        with self._lock:
+            return {"browsers": self._launched, "in_use": self._in_use}
@@ -1,24 +1,48 @@
+import asyncio
+import httpx
 import requests
 import json
 import time
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
 
 class SelectorHealerClient:
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
+        # One session keeps connections alive across submit, stream and poll calls
+        self.session = requests.Session()
     
-    def run_test(self, test_case: Dict) -> Dict:
-        """Submit test for execution and wait for completion"""
-        # Start test
-        response = requests.post(f"{self.base_url}/test/run", json=test_case)
+    def run_test(self, test_case: Dict, priority: str = "normal",
+                 on_event: Optional[Callable[[Dict], None]] = None,
+                 dedupe: bool = False, max_age: float = 0) -> Dict:
+        """Submit test for execution and wait for completion.
+
+        With `dedupe`, attach to an identical queued or running job, or reuse
+        one completed within `max_age` seconds.
+        """
+        # Start test, backing off while the service queue is full
+        while True:
+            response = self.session.post(f"{self.base_url}/test/run", json=test_case,
+                                     params={"priority": priority, "dedupe": dedupe,
+                                             "max_age": max_age})
+            if response.status_code != 429:
+                break
+            time.sleep(int(response.headers.get("Retry-After", "1")))
         response.raise_for_status()
         
         job_data = response.json()
         job_id = job_data["job_id"]
         
-        # Poll for completion
+        # Follow progress events until completion, long-polling if streaming is unavailable
+        try:
+            self._follow_events(job_id, on_event)
+        except requests.RequestException as e:
+            print(f"Event stream unavailable, long-polling instead: {e}")
+        
         while True:
-            status_response = requests.get(f"{self.base_url}/job/{job_id}")
+            status_response = self.session.get(f"{self.base_url}/job/{job_id}",
+                                           params={"wait": 30})
             status_response.raise_for_status()
             
             status = status_response.json()
@@ -27,8 +51,28 @@ class SelectorHealerClient:
                 return status["result"]
             elif status["status"] == "failed":
                 raise Exception(f"Test failed: {status['error']}")
-            
-            time.sleep(1)
+            elif status["status"] == "cancelled":
+                raise Exception(f"Test cancelled: {status['error']}")
+
+    def cancel(self, job_id: str) -> Dict:
+        """Cancel a queued or running job"""
+        response = self.session.delete(f"{self.base_url}/job/{job_id}")
+        response.raise_for_status()
+        return response.json()
+    
+    def _follow_events(self, job_id: str, on_event: Optional[Callable[[Dict], None]] = None):
+        """Read the job's server-sent events until a completion event arrives"""
+        with self.session.get(f"{self.base_url}/job/{job_id}/events", stream=True,
+                          timeout=(5, 60)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if on_event:
+                    on_event(event)
+                if event["type"] in FINISHED_STATUSES:
+                    return
     
     def heal_selector(self, url: str, failed_selector: str, 
                      description: str, alternatives: Optional[List[str]] = None) -> str:
@@ -40,11 +84,150 @@ class SelectorHealerClient:
             "alternatives": alternatives
         }
         
-        response = requests.post(f"{self.base_url}/heal", json=payload)
+        response = self.session.post(f"{self.base_url}/heal", json=payload)
         response.raise_for_status()
         
         return response.json()["healed_selector"]
 
+    def heal_batch(self, url: str, items: List[Dict],
+                   setup_steps: Optional[List[Dict]] = None) -> Dict:
+        """Heal many selectors of one page with a single page load"""
+        payload = {
+            "url": url,
+            "setup_steps": setup_steps or [],
+            "items": items
+        }
+        
+        response = self.session.post(f"{self.base_url}/heal/batch", json=payload)
+        response.raise_for_status()
+        
+        return response.json()
+
+    def run_tests(self, test_cases: List[Dict], concurrency: int = 8,
+                  priority: str = "normal") -> List[Dict]:
+        """Run many tests concurrently, returning outcomes in submission order"""
+        async def collect():
+            async with AsyncSelectorHealerClient(self.base_url, max_connections=concurrency) as client:
+                return [outcome async for outcome in
+                        client.run_tests(test_cases, concurrency=concurrency, priority=priority)]
+        return sorted(asyncio.run(collect()), key=lambda outcome: outcome["index"])
+
+
+class AsyncSelectorHealerClient:
+    """Asyncio client for driving whole suites over a shared connection pool"""
+
+    def __init__(self, base_url: str = "http://localhost:8000", max_connections: int = 20):
+        self.base_url = base_url
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(60, connect=5)
+        )
+
+    async def __aenter__(self) -> "AsyncSelectorHealerClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def submit(self, test_case: Dict, priority: str = "normal", dedupe: bool = False,
+                     max_age: float = 0) -> str:
+        """Queue a test, backing off while the service queue is full; returns the job id"""
+        while True:
+            response = await self._http.post("/test/run", json=test_case,
+                                              params={"priority": priority,
+                                                      "dedupe": str(dedupe).lower(),
+                                                      "max_age": max_age})
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(int(response.headers.get("Retry-After", "1")))
+        response.raise_for_status()
+        return response.json()["job_id"]
+
+    async def wait(self, job_id: str, on_event: Optional[Callable[[Dict], None]] = None,
+                   max_backoff: float = 10) -> Dict:
+        """Follow a job until it finishes and return its final status"""
+        try:
+            await self._follow_events(job_id, on_event)
+        except httpx.HTTPError as e:
+            print(f"Event stream unavailable, long-polling instead: {e}")
+
+        # Long-poll; connection errors and 5xx back off exponentially
+        backoff = 0.5
+        while True:
+            try:
+                response = await self._http.get(f"/job/{job_id}", params={"wait": 30})
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    status = response.json()
+                    if status["status"] in FINISHED_STATUSES:
+                        return status
+                    backoff = 0.5
+                    continue
+            except httpx.TransportError as e:
+                print(f"Polling job {job_id} failed, retrying in {backoff}s: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+    async def _follow_events(self, job_id: str, on_event: Optional[Callable[[Dict], None]] = None):
+        """Read the job's server-sent events until a completion event arrives"""
+        async with self._http.stream("GET", f"/job/{job_id}/events",
+                                     timeout=httpx.Timeout(60, connect=5)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if on_event:
+                    on_event(event)
+                if event["type"] in FINISHED_STATUSES:
+                    return
+
+    async def run_test(self, test_case: Dict, priority: str = "normal",
+                       on_event: Optional[Callable[[Dict], None]] = None,
+                       dedupe: bool = False, max_age: float = 0) -> Dict:
+        """Submit a test and wait for it; returns the healed test case"""
+        job_id = await self.submit(test_case, priority, dedupe, max_age)
+        status = await self.wait(job_id, on_event)
+        if status["status"] != "completed":
+            raise Exception(f"Test {status['status']}: {status['error']}")
+        return status["result"]
+
+    async def run_tests(self, test_cases: List[Dict], concurrency: int = 8,
+                        priority: str = "normal",
+                        on_event: Optional[Callable[[Dict], None]] = None) -> AsyncIterator[Dict]:
+        """Run tests with at most `concurrency` in flight, yielding outcomes as they finish.
+
+        Each outcome is {index, name, job_id, status, result, error}; a failed
+        test is reported, not raised.
+        """
+        limit = asyncio.Semaphore(concurrency)
+
+        async def run_one(index: int, test_case: Dict) -> Dict:
+            outcome = {"index": index, "name": test_case.get("name"), "job_id": None}
+            async with limit:
+                try:
+                    outcome["job_id"] = await self.submit(test_case, priority)
+                    status = await self.wait(outcome["job_id"], on_event)
+                    outcome.update(status=status["status"], result=status.get("result"),
+                                   error=status.get("error"))
+                except Exception as e:
+                    outcome.update(status="failed", result=None, error=str(e))
+            return outcome
+
+        tasks = [asyncio.ensure_future(run_one(i, test_case))
+                 for i, test_case in enumerate(test_cases)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
 # Example usage
 if __name__ == "__main__":
     client = SelectorHealerClient()
@@ -54,5 +237,5 @@ if __name__ == "__main__":
         test_case = json.load(f)
     
     # Run test
-    result = client.run_test(test_case)
+    result = client.run_test(test_case, on_event=lambda event: print("Event:", event["type"]))
     print("Updated test case:", json.dumps(result, indent=2))
\ No newline at end of file
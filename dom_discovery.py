@@ -0,0 +1,214 @@
+from playwright.sync_api import Page, Frame, Locator
+from typing import Dict, List, Optional
+
+# Separates an iframe selector from the selector inside that frame, e.g.
+# 'iframe#checkout >>> input[name="card"]'. CSS selectors already pierce
+# open shadow roots in Playwright, so only frames need qualifying.
+FRAME_DELIMITER = " >>> "
+
+# Serializes one frame's document, descending into open shadow roots, and
+# describes its iframes so child frames can be qualified. Runs once per frame.
+DISCOVERY_SCRIPT = """
+(maxChars) => {
+    const SKIP = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'LINK', 'META', 'TEMPLATE', 'SVG']);
+    const KEEP_ATTRS = ['id', 'name', 'type', 'class', 'role', 'placeholder', 'value', 'href',
+                        'for', 'title', 'alt', 'src', 'data-testid', 'data-test', 'data-field',
+                        'aria-label', 'aria-labelledby'];
+    const parts = [];
+    const iframes = [];
+    let size = 0;
+
+    const emit = (text) => {
+        parts.push(text);
+        size += text.length;
+    };
+    const quote = (value) => String(value).replace(/"/g, '\\\\"');
+    const attrs = (el) => {
+        let out = '';
+        for (const name of KEEP_ATTRS) {
+            const value = el.getAttribute(name);
+            if (value !== null && value !== '') {
+                out += ` ${name}="${quote(value).slice(0, 80)}"`;
+            }
+        }
+        return out;
+    };
+    const frameSelector = (el) => {
+        if (el.id) return `iframe#${CSS.escape(el.id)}`;
+        if (el.name) return `iframe[name="${quote(el.name)}"]`;
+        const src = el.getAttribute('src');
+        if (src) return `iframe[src="${quote(src)}"]`;
+        return `iframe >> nth=${iframes.length}`;
+    };
+    const walk = (node) => {
+        if (size > maxChars) return;
+        if (node.nodeType === Node.TEXT_NODE) {
+            const text = node.textContent.trim();
+            if (text) emit(text.slice(0, 80));
+            return;
+        }
+        if (node.nodeType !== Node.ELEMENT_NODE || SKIP.has(node.tagName)) return;
+        const tag = node.tagName.toLowerCase();
+        if (tag === 'iframe') {
+            iframes.push({selector: frameSelector(node), name: node.name || '', src: node.src || ''});
+        }
+        emit(`<${tag}${attrs(node)}>`);
+        if (node.shadowRoot) {
+            emit('<#shadow-root>');
+            node.shadowRoot.childNodes.forEach(walk);
+            emit('</#shadow-root>');
+        }
+        node.childNodes.forEach(walk);
+        emit(`</${tag}>`);
+    };
+
+    walk(document.body || document.documentElement);
+    return {html: parts.join('').slice(0, maxChars), iframes: iframes};
+}
+"""
+
+
+def split_frame_selector(selector: str) -> List[str]:
+    """Split a frame-qualified selector into frame selectors and the element selector"""
+    return [part.strip() for part in selector.split(FRAME_DELIMITER)]
+
+
+def resolve_locator(page: Page, selector: str) -> Locator:
+    """Build a locator for a selector that may be qualified with iframe selectors"""
+    parts = split_frame_selector(selector)
+    scope = page
+    for frame_selector in parts[:-1]:
+        scope = scope.frame_locator(frame_selector)
+    return scope.locator(parts[-1])
+
+
+def _match_child_frame(child: Frame, iframes: List[Dict]) -> Optional[str]:
+    """Find the iframe selector, from the parent's snapshot, that hosts a child frame"""
+    for iframe in iframes:
+        if child.name and iframe["name"] == child.name:
+            return iframe["selector"]
+    for iframe in iframes:
+        if iframe["src"] and iframe["src"] == child.url:
+            return iframe["selector"]
+    return None
+
+
+def discover_dom(page: Page, max_chars: int = 8000) -> str:
+    """Collect DOM context from every frame, including open shadow roots"""
+    sections = []
+    remaining = max_chars
+    prefixes = {page.main_frame: ""}
+    queue = [page.main_frame]
+
+    while queue and remaining > 0:
+        frame = queue.pop(0)
+        prefix = prefixes[frame]
+        try:
+            snapshot = frame.evaluate(DISCOVERY_SCRIPT, remaining)
+        except Exception as e:
+            print(f"DOM discovery skipped frame {frame.url}: {e}")
+            continue
+
+        for child in frame.child_frames:
+            frame_selector = _match_child_frame(child, snapshot["iframes"])
+            if frame_selector:
+                prefixes[child] = prefix + frame_selector + FRAME_DELIMITER
+                queue.append(child)
+
+        if prefix:
+            header = f'\n<!-- FRAME: prefix selectors in this frame with "{prefix}" -->\n'
+        else:
+            header = ""
+        section = header + snapshot["html"]
+        sections.append(section[:remaining])
+        remaining -= len(section)
+
+    return "".join(sections)
+
+
+# Reports everything action-aware validation needs about a selector's matches
+# in a single round trip: match count plus the first match's state.
+ELEMENT_CHECK_SCRIPT = """
+(elements, expectedText) => {
+    const el = elements[0];
+    if (!el) return {count: 0};
+    const NOT_TEXT_INPUTS = ['button', 'submit', 'reset', 'checkbox', 'radio', 'file',
+                             'image', 'hidden', 'range', 'color'];
+    const style = getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    const visible = rect.width > 0 && rect.height > 0 &&
+        style.visibility !== 'hidden' && style.display !== 'none';
+    const enabled = !el.disabled && !el.closest('fieldset:disabled') &&
+        el.getAttribute('aria-disabled') !== 'true';
+    const textInput = (el.tagName === 'INPUT' && !NOT_TEXT_INPUTS.includes(el.type)) ||
+        el.tagName === 'TEXTAREA' || el.isContentEditable;
+    return {
+        count: elements.length,
+        visible: visible,
+        enabled: enabled,
+        editable: textInput && enabled && !el.readOnly,
+        has_text: !expectedText || (el.textContent || '').includes(expectedText)
+    };
+}
+"""
+
+
+def inspect_matches(page: Page, selector: str, expected_text: Optional[str] = None) -> Dict:
+    """Count a selector's matches and describe the first one in one evaluation"""
+    return resolve_locator(page, selector).evaluate_all(ELEMENT_CHECK_SCRIPT, expected_text)
+
+
+# Summarizes what a list of matched elements looks like, shared by the batched
+# and per-locator resolvers below so their results compare equal.
+_DESCRIBE_MATCHES = """
+const describeMatches = (matches) => {
+    const el = matches[0];
+    if (!el) return {count: 0};
+    return {
+        count: matches.length,
+        tag: el.tagName.toLowerCase(),
+        id: el.id || '',
+        text: (el.textContent || '').trim().replace(/\\s+/g, ' ').slice(0, 60)
+    };
+};
+"""
+
+# Resolves many CSS selectors in one evaluation, searching open shadow roots
+# too. Selectors the browser's CSS engine rejects (Playwright extensions such
+# as :has-text) come back as null for per-locator resolution.
+BATCH_RESOLVE_SCRIPT = """
+(selectors) => {
+""" + _DESCRIBE_MATCHES + """
+    const roots = [document];
+    for (let i = 0; i < roots.length; i++) {
+        roots[i].querySelectorAll('*').forEach((el) => {
+            if (el.shadowRoot) roots.push(el.shadowRoot);
+        });
+    }
+    return selectors.map((selector) => {
+        const matches = [];
+        try {
+            for (const root of roots) matches.push(...root.querySelectorAll(selector));
+        } catch (e) {
+            return null;
+        }
+        return describeMatches(matches);
+    });
+}
+"""
+
+LOCATOR_RESOLVE_SCRIPT = "(elements) => {" + _DESCRIBE_MATCHES + "return describeMatches(elements); }"
+
+
+def resolve_selectors(page: Page, selectors: List[str]) -> Dict[str, Dict]:
+    """Match count and first-match signature of every selector, batching plain CSS in one call"""
+    plain = [s for s in selectors if FRAME_DELIMITER not in s]
+    results = dict(zip(plain, page.evaluate(BATCH_RESOLVE_SCRIPT, plain))) if plain else {}
+    for selector in selectors:
+        if results.get(selector) is None:
+            try:
+                results[selector] = resolve_locator(page, selector).evaluate_all(
+                    LOCATOR_RESOLVE_SCRIPT)
+            except Exception as e:
+                results[selector] = {"count": 0, "error": str(e).splitlines()[0]}
+    return results
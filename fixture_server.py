@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Threaded HTTP server for demo pages and benchmark fixtures.
+
+Serves files from a root directory plus pages registered in memory. Files are
+read once and kept in an in-memory cache (reloaded when they change on disk)
+and answered with ETag and Cache-Control headers, so many parallel browser
+workers mostly get cached bytes or 304s. A latency profile can slow responses
+down to mimic real networks.
+
+    python fixture_server.py --root benchmark_corpus --port 8080 --latency broadband
+"""
+
+import argparse
+import hashlib
+import mimetypes
+import os
+import posixpath
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+# (base seconds, random extra seconds, bytes per second or 0 for unlimited)
+LATENCY_PROFILES: Dict[str, Tuple[float, float, float]] = {
+    "none": (0.0, 0.0, 0),
+    "lan": (0.002, 0.002, 0),
+    "broadband": (0.03, 0.02, 5_000_000),
+    "3g": (0.3, 0.1, 200_000),
+}
+
+
+class _Entry:
+    __slots__ = ("body", "etag", "content_type", "mtime", "latency")
+
+    def __init__(self, body: bytes, content_type: str, mtime: Optional[float] = None,
+                 latency: Optional[float] = None):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.content_type = content_type
+        self.mtime = mtime
+        self.latency = latency
+
+
+class FixtureServer:
+    """Serves a directory and registered pages from memory on a background thread"""
+
+    def __init__(self, root: str = ".", port: int = 8080, host: str = "",
+                 max_age: int = 0, latency: str = "none"):
+        self.root = os.path.abspath(root)
+        self.port = port
+        self.host = host
+        # 0 makes browsers revalidate every load (cheap 304s) so edited files show up
+        self.max_age = max_age
+        self.latency = LATENCY_PROFILES[latency]
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+        self._pages: Dict[str, _Entry] = {}
+        self._files: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start serving in a background thread"""
+        self.server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.server.daemon_threads = True
+        # Port 0 picks a free port
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"🌐 Fixture server serving {self.root} at {self.url('/')}")
+
+    def stop(self):
+        """Stop the server"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            print("🛑 Fixture server stopped")
+
+    def url(self, path: str) -> str:
+        """Absolute URL of a served path"""
+        return f"http://{self.host or 'localhost'}:{self.port}/{path.lstrip('/')}"
+
+    def register_page(self, path: str, content, content_type: str = "text/html; charset=utf-8",
+                      latency: Optional[float] = None) -> str:
+        """Serve `content` at `path` from memory, taking precedence over files; returns its URL"""
+        body = content.encode("utf-8") if isinstance(content, str) else content
+        with self._lock:
+            self._pages["/" + path.lstrip("/")] = _Entry(body, content_type, latency=latency)
+        return self.url(path)
+
+    def unregister_page(self, path: str):
+        with self._lock:
+            self._pages.pop("/" + path.lstrip("/"), None)
+
+    def _lookup(self, path: str) -> Optional[_Entry]:
+        """Registered page, or cached file content, for a request path"""
+        with self._lock:
+            entry = self._pages.get(path)
+        if entry is not None:
+            return entry
+
+        relative = posixpath.normpath(path).lstrip("/")
+        if relative.startswith(".."):
+            return None
+        file_path = os.path.join(self.root, relative)
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, "index.html")
+        try:
+            mtime = os.stat(file_path).st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            entry = self._files.get(file_path)
+        if entry is None or entry.mtime != mtime:
+            with open(file_path, "rb") as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+            if content_type.startswith("text/") or content_type.endswith(("javascript", "json")):
+                content_type += "; charset=utf-8"
+            entry = _Entry(body, content_type, mtime=mtime)
+            with self._lock:
+                self._files[file_path] = entry
+        return entry
+
+    def _delay(self, entry: _Entry) -> float:
+        if entry.latency is not None:
+            return entry.latency
+        base, jitter, bandwidth = self.latency
+        delay = base + random.uniform(0, jitter)
+        if bandwidth:
+            delay += len(entry.body) / bandwidth
+        return delay
+
+    def _handler_class(self):
+        server = self
+
+        class FixtureHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def _respond(self, send_body: bool):
+                entry = server._lookup(unquote(urlsplit(self.path).path))
+                if entry is None:
+                    self.send_error(404, "File not found")
+                    return
+                delay = server._delay(entry)
+                if delay:
+                    time.sleep(delay)
+
+                if self.headers.get("If-None-Match") == entry.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", entry.etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", entry.content_type)
+                self.send_header("Content-Length", str(len(entry.body)))
+                self.send_header("ETag", entry.etag)
+                self.send_header("Cache-Control", f"public, max-age={server.max_age}"
+                                 if server.max_age else "no-cache")
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(entry.body)
+
+            def log_message(self, format, *args):
+                # Per-request logging would dominate the cost of cached responses
+                pass
+
+        return FixtureHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve demo pages and benchmark fixtures")
+    parser.add_argument("--root", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-age", type=int, default=0, help="Cache-Control max-age in seconds")
+    parser.add_argument("--latency", choices=sorted(LATENCY_PROFILES), default="none")
+    args = parser.parse_args()
+
+    server = FixtureServer(args.root, args.port, max_age=args.max_age, latency=args.latency)
+    server.start()
+    try:
+        print("Server running... Press Ctrl+C to stop")
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Remote worker that pulls test jobs from a shared broker.
+
+Run any number of these next to a service started with HEALER_MODE=frontend.
+The SQLite broker uses WAL mode, which needs shared memory, so its workers
+must run on the service's host with the database on a local disk, never on
+a network filesystem; workers on other hosts need a network broker that
+implements JobBroker:
+
+    HEALER_BROKER_DB=/var/lib/healer/broker.db python healer_worker.py --workers 4
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+import uuid
+from browser_pool import BrowserPool
+from job_broker import JobBroker, SQLiteBroker
+from test_runner import PlaywrightTestRunner, TestCancelled
+
+
+class RemoteWorker:
+    """Leases jobs from a broker and runs them on this host's browser pool"""
+
+    def __init__(self, broker: JobBroker, browser_pool: BrowserPool, worker_id: str,
+                 lease_seconds: float = 60, poll_interval: float = 1.0):
+        self.broker = broker
+        self.browser_pool = browser_pool
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+
+    def stop(self):
+        """Finish the current job, then exit run_forever"""
+        self._stopped.set()
+
+    def run_forever(self):
+        """Lease and run jobs until stopped"""
+        try:
+            while not self._stopped.is_set():
+                leased = self.broker.lease(self.worker_id, self.lease_seconds)
+                if leased is None:
+                    self._stopped.wait(self.poll_interval)
+                    continue
+                self.run_job(*leased)
+        finally:
+            self.browser_pool.close_current()
+
+    def run_job(self, job_id: str, test_data: dict):
+        """Run one leased job, heartbeating until it finishes"""
+        done = threading.Event()
+        cancelled = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, done, cancelled),
+                                     daemon=True)
+        heartbeat.start()
+        self.broker.publish(job_id, self.worker_id, "running")
+        try:
+            runner = PlaywrightTestRunner(
+                test_data,
+                on_event=lambda event_type, data: self.broker.publish(
+                    job_id, self.worker_id, event_type, data),
+                pause=0,
+                browser_pool=self.browser_pool,
+                cancelled=cancelled
+            )
+            outcome = runner.run_test()
+            self.broker.publish(job_id, self.worker_id, "report", outcome["report"])
+            status, result, error = "completed", outcome["test"], None
+        except TestCancelled as e:
+            status, result, error = "cancelled", None, str(e)
+        except Exception as e:
+            status, result, error = "failed", None, str(e)
+        finally:
+            done.set()
+
+        if not self.broker.complete(job_id, self.worker_id, status, result, error):
+            print(f"Lease on job {job_id} was lost, result discarded")
+
+    def _heartbeat(self, job_id: str, done: threading.Event, cancelled: threading.Event):
+        """Keep the lease alive while the job runs, stopping the job once the lease is gone"""
+        # Heartbeats double as the cancellation check, so keep them frequent
+        while not done.wait(min(self.lease_seconds / 3, 5)):
+            if not self.broker.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                print(f"Lease on job {job_id} was cancelled or expired, stopping it")
+                cancelled.set()
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pull selector-healer test jobs from a broker")
+    parser.add_argument("--broker-db", default=os.environ.get("HEALER_BROKER_DB", "healer_broker.db"))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("HEALER_WORKERS", "4")))
+    parser.add_argument("--lease", type=float, default=60, help="lease length in seconds")
+    args = parser.parse_args()
+
+    broker = SQLiteBroker(args.broker_db)
+    browser_pool = BrowserPool(headless=True)
+    host = f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+    workers = [RemoteWorker(broker, browser_pool, f"{host}-{i}", lease_seconds=args.lease)
+               for i in range(args.workers)]
+    threads = [threading.Thread(target=worker.run_forever, daemon=True) for worker in workers]
+    for thread in threads:
+        thread.start()
+
+    print(f"👷 {args.workers} workers pulling jobs from {args.broker_db}")
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping after current jobs...")
+        for worker in workers:
+            worker.stop()
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Benchmark selector healing over a corpus of original/mutated page pairs.
+
+Each corpus case names an original page, a mutated page and the steps whose
+selectors the mutation breaks, with a ground-truth selector for the element
+each step should land on in the mutated page:
+
+    python healing_benchmark.py --backend stub
+    python healing_benchmark.py --backend ollama --json report.json
+
+Reports heal accuracy, p50/p95 heal latency, prompt tokens and LLM calls
+per heal. The stub backend answers from the prompt's DOM context without a
+model, which isolates the healer's own overhead.
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from playwright.sync_api import Page, sync_playwright
+from dom_discovery import inspect_matches, resolve_locator
+from fixture_server import LATENCY_PROFILES, FixtureServer
+from heuristic_responder import HeuristicResponder
+from selector_healer import SelectorHealer
+
+
+def load_corpus(root: str) -> List[Dict]:
+    """Cases from every JSON file under `root`, with page paths made absolute"""
+    cases = []
+    for path in sorted(Path(root).glob("**/*.json")):
+        with open(path, "r") as f:
+            case = json.load(f)
+        case.setdefault("name", path.stem)
+        for page in ("original", "mutated"):
+            case[page] = (path.parent / case[page]).resolve()
+        cases.append(case)
+    return cases
+
+
+class BenchmarkHealer(SelectorHealer):
+    """SelectorHealer that counts LLM calls and prompt tokens, optionally answered locally"""
+
+    def __init__(self, responder: Optional[HeuristicResponder] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.responder = responder
+        self.calls = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    def _query_ollama(self, prompt: str, model: Optional[str] = None,
+                      context: Optional[List[int]] = None,
+                      timeout: float = 30) -> Optional[Dict]:
+        if self.responder:
+            reply = self.responder.respond(prompt, context)
+        else:
+            reply = super()._query_ollama(prompt, model, context, timeout)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += reply.get("prompt_tokens", 0) if reply else 0
+        return reply
+
+
+def same_element(page: Page, selector: str, truth: str) -> bool:
+    """Whether `selector` uniquely matches the element `truth` points at"""
+    try:
+        found = resolve_locator(page, selector)
+        if found.count() != 1:
+            return False
+        expected = resolve_locator(page, truth).element_handle(timeout=1000)
+        return found.evaluate("(el, expected) => el === expected", expected)
+    except Exception:
+        # Matches in different frames cannot be compared and are not the same element
+        return False
+
+
+def is_broken(page: Page, selector: str) -> bool:
+    """Whether a selector no longer matches anything"""
+    try:
+        return inspect_matches(page, selector)["count"] == 0
+    except Exception:
+        return True
+
+
+def run_case(page: Page, healer: BenchmarkHealer, case: Dict,
+             url: Optional[str] = None) -> List[Dict]:
+    """Heal every broken target of one case on its mutated page, loaded from `url` if given"""
+    page.goto(url or case["mutated"].as_uri())
+    results = []
+    for target in case["targets"]:
+        result = {"case": case["name"], "description": target["description"],
+                  "selector": target["selector"], "truth": target["truth"]}
+        results.append(result)
+        if not is_broken(page, target["selector"]):
+            result["status"] = "not_broken"
+            continue
+
+        calls, prompt_tokens = healer.calls, healer.prompt_tokens
+        started = time.monotonic()
+        healed = healer.heal_selector(page, target["selector"], target["description"],
+                                      target.get("alternatives"), step=target)
+        result["seconds"] = round(time.monotonic() - started, 3)
+        result["llm_calls"] = healer.calls - calls
+        result["prompt_tokens"] = healer.prompt_tokens - prompt_tokens
+        result["healed_selector"] = healed
+        if healed is None:
+            result["status"] = "unhealed"
+        else:
+            result["status"] = "correct" if same_element(page, healed, target["truth"]) else "wrong"
+    return results
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(results: List[Dict]) -> Dict:
+    """Accuracy, latency and LLM cost over every attempted heal"""
+    heals = [r for r in results if r["status"] != "not_broken"]
+    seconds = [r["seconds"] for r in heals]
+    count = len(heals) or 1
+    return {
+        "targets": len(results),
+        "heals": len(heals),
+        "not_broken": len(results) - len(heals),
+        "accuracy": round(sum(1 for r in heals if r["status"] == "correct") / count, 3),
+        "healed_rate": round(sum(1 for r in heals if r["status"] != "unhealed") / count, 3),
+        "p50_seconds": round(percentile(seconds, 50), 3),
+        "p95_seconds": round(percentile(seconds, 95), 3),
+        "prompt_tokens_per_heal": round(sum(r["prompt_tokens"] for r in heals) / count, 1),
+        "llm_calls_per_heal": round(sum(r["llm_calls"] for r in heals) / count, 2),
+    }
+
+
+def run_benchmark(cases: List[Dict], healer: BenchmarkHealer, headless: bool = True,
+                  server: Optional[FixtureServer] = None) -> Dict:
+    """Run every case in one browser and return per-target results with a summary.
+
+    With a `server` whose root holds the corpus pages, pages load over HTTP
+    instead of from file:// URLs.
+    """
+    results = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless)
+        try:
+            for case in cases:
+                context = browser.new_context()
+                page = context.new_page()
+                # Validation probes must not wait out Playwright's 30s default
+                page.set_default_timeout(2000)
+                try:
+                    url = server.url(os.path.relpath(case["mutated"], server.root)) \
+                        if server else None
+                    results.extend(run_case(page, healer, case, url))
+                finally:
+                    context.close()
+        finally:
+            browser.close()
+    return {"summary": summarize(results), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark selector healing accuracy and latency")
+    parser.add_argument("--corpus", default="benchmark_corpus", help="directory of case files")
+    parser.add_argument("--backend", choices=("stub", "ollama"), default="stub")
+    parser.add_argument("--ollama-url", default=os.environ.get("OLLAMA_URL", "http://localhost:11434"))
+    parser.add_argument("--case", action="append", help="only run cases with this name")
+    parser.add_argument("--json", help="also write the full report to this file")
+    parser.add_argument("--headed", action="store_true", help="show the browser")
+    parser.add_argument("--serve", choices=sorted(LATENCY_PROFILES),
+                        help="load pages through a local fixture server with this latency profile")
+    args = parser.parse_args()
+
+    cases = load_corpus(args.corpus)
+    if args.case:
+        cases = [case for case in cases if case["name"] in args.case]
+    responder = HeuristicResponder() if args.backend == "stub" else None
+    healer = BenchmarkHealer(responder, ollama_url=args.ollama_url)
+
+    print(f"🧪 Healing {sum(len(c['targets']) for c in cases)} targets in {len(cases)} cases "
+          f"with the {args.backend} backend")
+    server = None
+    if args.serve:
+        root = os.path.commonpath([str(case[page].parent) for case in cases
+                                   for page in ("original", "mutated")])
+        server = FixtureServer(root, port=0, latency=args.serve)
+        server.start()
+    try:
+        report = run_benchmark(cases, healer, headless=not args.headed, server=server)
+    finally:
+        if server:
+            server.stop()
+
+    for result in report["results"]:
+        mark = {"correct": "✅", "wrong": "❌", "unhealed": "⛔", "not_broken": "➖"}[result["status"]]
+        detail = "" if result["status"] == "not_broken" else \
+            f" -> {result['healed_selector']} ({result['seconds']}s, {result['llm_calls']} calls)"
+        print(f"{mark} {result['case']}: {result['description']}{detail}")
+    print(json.dumps(report["summary"], indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,7 +20,7 @@ def run_healing_demo():
     print("=" * 50)
     
     # Paths
-    test_file = "/Users/aarij.hussaan/development/ollama_tester/demo_test.json"
+    test_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_test.json")
     original_url = "http://localhost:8080/demo_page_original.html"
     modified_url = "http://localhost:8080/demo_page_modified.html"
     
@@ -0,0 +1,153 @@
+"""Deterministic stand-in for the LLM behind SelectorHealer.
+
+Answers healing prompts by scoring the elements in the prompt's DOM context
+against the step description, so healing can be benchmarked and load-tested
+without a model. Follow-up prompts get the next-ranked candidate.
+"""
+
+import itertools
+import json
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+TAG_RE = re.compile(r'<([a-z][\w-]*)((?:\s[\w-]+="(?:[^"\\]|\\.)*")*)>([^<]*)')
+ATTR_RE = re.compile(r'([\w-]+)="((?:[^"\\]|\\.)*)"')
+FRAME_RE = re.compile(r'<!-- FRAME: prefix selectors in this frame with "(.*)" -->')
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Attributes tried in order when building a selector for the chosen element
+SELECTOR_ATTRS = ("data-testid", "data-test", "id", "name", "data-field", "aria-label",
+                  "placeholder", "href", "title", "alt")
+STOP_WORDS = {"the", "and", "for", "into", "with", "field", "step", "click", "fill", "type",
+              "enter", "verify", "check", "appears", "press"}
+TEXT_INPUT_TAGS = {"input", "textarea"}
+CLICKABLE_TAGS = {"button", "a", "input", "label", "summary", "select"}
+# Description words that name an element type
+TAG_WORDS = {"button": "button", "link": "a", "checkbox": "input", "textarea": "textarea",
+             "heading": "h1", "image": "img", "dropdown": "select"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token for English and markup"""
+    return max(1, len(text) // 4)
+
+
+def parse_elements(dom_context: str) -> List[Dict]:
+    """Elements of discover_dom output as {tag, attrs, text, prefix}"""
+    elements = []
+    prefix = ""
+    frame_starts = [(match.start(), match.group(1)) for match in FRAME_RE.finditer(dom_context)]
+    for match in TAG_RE.finditer(dom_context):
+        while frame_starts and frame_starts[0][0] < match.start():
+            prefix = frame_starts.pop(0)[1]
+        attrs = {name: value.replace('\\"', '"') for name, value in ATTR_RE.findall(match.group(2))}
+        elements.append({"tag": match.group(1), "attrs": attrs,
+                         "text": match.group(3).strip(), "prefix": prefix})
+
+    # Let inputs be found by their label text
+    labels = {(el["prefix"], el["attrs"]["for"]): el["text"] for el in elements
+              if el["tag"] == "label" and el["attrs"].get("for")}
+    for el in elements:
+        label = labels.get((el["prefix"], el["attrs"].get("id")))
+        if label:
+            el["text"] = f"{el['text']} {label}".strip()
+    return elements
+
+
+def _words(text: str) -> set:
+    return set(WORD_RE.findall(text.lower()))
+
+
+def _score(element: Dict, words: set, action: Optional[str]) -> float:
+    tag = element["tag"]
+    # The frame prefix counts too, so "newsletter email" finds the newsletter iframe's field
+    haystack = _words(" ".join(element["attrs"].values()) + " " + element["text"] + " " +
+                      element["prefix"])
+    score = 2.0 * len(words & haystack)
+    score += sum(1 for word in words if TAG_WORDS.get(word) == tag)
+    if action in ("fill", "type"):
+        text_input = tag in TEXT_INPUT_TAGS and element["attrs"].get("type") not in (
+            "button", "submit", "checkbox", "radio", "hidden")
+        score += 3 if text_input else -5
+    elif action == "click" and tag in CLICKABLE_TAGS:
+        score += 2
+    return score
+
+
+def _selector_for(element: Dict, elements: List[Dict]) -> Optional[str]:
+    """Most specific attribute or text selector that matches only this element"""
+    peers = [el for el in elements if el["prefix"] == element["prefix"]]
+    tag = element["tag"]
+    for name in SELECTOR_ATTRS:
+        value = element["attrs"].get(name)
+        if not value:
+            continue
+        if sum(1 for el in peers if el["attrs"].get(name) == value) == 1:
+            escaped = value.replace('"', '\\"')
+            selector = f"#{value}" if name == "id" and WORD_RE.fullmatch(value.lower()) \
+                else f'{tag}[{name}="{escaped}"]'
+            return element["prefix"] + selector
+    text = element["text"]
+    if text and sum(1 for el in peers if el["tag"] == tag and text in el["text"]) == 1:
+        return element["prefix"] + f'{tag}:has-text("{text[:60]}")'
+    return None
+
+
+def rank_selectors(dom_context: str, description: str, exclude: Tuple[str, ...] = ()) -> List[str]:
+    """Candidate selectors for the described element, best first"""
+    words = _words(description)
+    action = next((word for word in ("fill", "type", "click") if word in words), None)
+    words -= STOP_WORDS
+    elements = parse_elements(dom_context)
+    scored = sorted(((_score(el, words, action), i) for i, el in enumerate(elements)),
+                    key=lambda pair: (-pair[0], pair[1]))
+    ranked = []
+    for score, i in scored:
+        if score <= 0:
+            break
+        selector = _selector_for(elements[i], elements)
+        if selector and selector not in ranked and selector not in exclude:
+            ranked.append(selector)
+    return ranked
+
+
+class HeuristicResponder:
+    """Answers /api/generate-style prompts, keeping ranked candidates per conversation"""
+
+    def __init__(self, max_conversations: int = 1000):
+        self.max_conversations = max_conversations
+        self._conversations: Dict[int, List[str]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def respond(self, prompt: str, context: Optional[List[int]] = None) -> Dict:
+        """Reply as {response, context, prompt_tokens}, like SelectorHealer._query_ollama"""
+        if "DOM CONTEXT:" in prompt:
+            candidates = rank_selectors(*self._parse_healing_prompt(prompt))
+            with self._lock:
+                conversation = next(self._ids)
+                self._conversations[conversation] = candidates
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.pop(next(iter(self._conversations)))
+        else:
+            conversation = context[-1] if context else 0
+            with self._lock:
+                candidates = self._conversations.get(conversation, [])
+                # The previous answer was rejected
+                if candidates:
+                    candidates.pop(0)
+
+        selector = candidates[0] if candidates else ""
+        return {"response": json.dumps({"selector": selector}),
+                "context": [conversation],
+                "prompt_tokens": estimate_tokens(prompt)}
+
+    @staticmethod
+    def _parse_healing_prompt(prompt: str) -> Tuple[str, str, Tuple[str, ...]]:
+        """DOM context, step description and already-known selectors from a healing prompt"""
+        description = re.search(r"STEP DESCRIPTION: (.*)", prompt)
+        failed = re.search(r"FAILED SELECTOR: (.*)", prompt)
+        dom = prompt.split("DOM CONTEXT:\n", 1)[1].split("\nEND DOM CONTEXT", 1)[0]
+        exclude = (failed.group(1).strip(),) if failed else ()
+        return dom, description.group(1) if description else "", exclude
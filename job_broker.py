@@ -0,0 +1,240 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from job_scheduler import PRIORITIES
+
+
+class JobBroker(ABC):
+    """Shared job queue between the service front end and remote workers.
+
+    Workers lease jobs for a limited time and must heartbeat to keep them;
+    a job whose lease runs out (the worker died) is handed to another worker.
+    Progress and results flow back to the front end as an ordered event log.
+    """
+
+    @abstractmethod
+    def enqueue(self, job_id: str, payload: Any, priority: str = "normal"):
+        """Add a job; enqueueing a known job id again does nothing"""
+
+    @abstractmethod
+    def depth(self) -> int:
+        """Jobs waiting for a worker"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Tuple[str, Any]]:
+        """Claim the next job as (job_id, payload), or None if nothing is waiting"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False means the job was redelivered elsewhere or cancelled"""
+
+    @abstractmethod
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Drop a waiting job or ask its worker to stop; returns the job's prior state"""
+
+    @abstractmethod
+    def publish(self, job_id: str, worker_id: str, event_type: str, data: Optional[Dict] = None):
+        """Report a progress event for a leased job"""
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, status: str, result: Optional[Dict] = None,
+                 error: Optional[str] = None) -> bool:
+        """Report a job's final status; ignored if the worker no longer holds the lease"""
+
+    @abstractmethod
+    def events_since(self, cursor: int, limit: int = 500) -> List[Tuple[int, str, str, Dict]]:
+        """Events after `cursor` as (cursor, job_id, event_type, data)"""
+
+    @abstractmethod
+    def ack(self, cursor: int):
+        """Drop events up to and including `cursor`"""
+
+
+class SQLiteBroker(JobBroker):
+    """Broker stand-in on a SQLite file, for workers on a single host.
+
+    WAL mode needs shared memory, so the file must sit on a local disk that
+    every process opens directly, not on a network filesystem.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS broker_jobs (
+            job_id TEXT PRIMARY KEY,
+            payload BLOB,
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            lease_owner TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_broker_ready ON broker_jobs (status, priority, created_at);
+        CREATE TABLE IF NOT EXISTS broker_events (
+            cursor INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            data BLOB
+        );
+    """
+
+    def __init__(self, path: str = "healer_broker.db", max_attempts: int = 3):
+        self.path = path
+        # Deliveries before a job whose workers keep dying is failed
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _pack(value: Any) -> Optional[bytes]:
+        if value is None:
+            return None
+        return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def _unpack(blob: Optional[bytes]) -> Any:
+        if blob is None:
+            return None
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def _event(self, job_id: str, event_type: str, data: Optional[Dict]):
+        self._conn.execute(
+            "INSERT INTO broker_events (job_id, event_type, data) VALUES (?, ?, ?)",
+            (job_id, event_type, self._pack(data))
+        )
+
+    def enqueue(self, job_id: str, payload: Any, priority: str = "normal"):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO broker_jobs (job_id, payload, priority, status, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, self._pack(payload), PRIORITIES[priority], time.time())
+            )
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM broker_jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Tuple[str, Any]]:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so two workers cannot claim one job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire_leases(now)
+                row = self._conn.execute(
+                    "SELECT job_id, payload FROM broker_jobs WHERE status = 'queued' "
+                    "ORDER BY priority, created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE broker_jobs SET status = 'leased', lease_owner = ?, "
+                        "lease_expires = ?, attempts = attempts + 1 WHERE job_id = ?",
+                        (worker_id, now + lease_seconds, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row[0], self._unpack(row[1])
+
+    def _expire_leases(self, now: float):
+        """Requeue jobs of workers that stopped heartbeating, failing repeat offenders"""
+        expired = self._conn.execute(
+            "SELECT job_id, attempts, status FROM broker_jobs "
+            "WHERE status IN ('leased', 'cancelling') AND lease_expires < ?",
+            (now,)
+        ).fetchall()
+        for job_id, attempts, status in expired:
+            if status == "cancelling":
+                self._conn.execute("DELETE FROM broker_jobs WHERE job_id = ?", (job_id,))
+                self._event(job_id, "cancelled", {"error": "Job was cancelled"})
+            elif attempts >= self.max_attempts:
+                self._conn.execute("DELETE FROM broker_jobs WHERE job_id = ?", (job_id,))
+                self._event(job_id, "failed", {"error": f"Worker lost {attempts} times, giving up"})
+            else:
+                self._conn.execute(
+                    "UPDATE broker_jobs SET status = 'queued', lease_owner = NULL WHERE job_id = ?",
+                    (job_id,)
+                )
+                self._event(job_id, "redelivered", {"attempts": attempts})
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE broker_jobs SET lease_expires = ? "
+                "WHERE job_id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, job_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT status FROM broker_jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                if row is None:
+                    status = None
+                elif row[0] == "queued":
+                    status = "queued"
+                    self._conn.execute("DELETE FROM broker_jobs WHERE job_id = ?", (job_id,))
+                else:
+                    # The worker's next heartbeat fails and it stops at a step boundary
+                    status = "leased"
+                    self._conn.execute(
+                        "UPDATE broker_jobs SET status = 'cancelling' WHERE job_id = ?", (job_id,)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def publish(self, job_id: str, worker_id: str, event_type: str, data: Optional[Dict] = None):
+        with self._lock:
+            self._event(job_id, event_type, dict(data or {}, worker=worker_id))
+
+    def complete(self, job_id: str, worker_id: str, status: str, result: Optional[Dict] = None,
+                 error: Optional[str] = None) -> bool:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "DELETE FROM broker_jobs WHERE job_id = ? "
+                    "AND status IN ('leased', 'cancelling') AND lease_owner = ?",
+                    (job_id, worker_id)
+                )
+                owned = cursor.rowcount == 1
+                if owned:
+                    self._event(job_id, status, {"result": result, "error": error,
+                                                 "worker": worker_id})
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return owned
+
+    def events_since(self, cursor: int, limit: int = 500) -> List[Tuple[int, str, str, Dict]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cursor, job_id, event_type, data FROM broker_events "
+                "WHERE cursor > ? ORDER BY cursor LIMIT ?",
+                (cursor, limit)
+            ).fetchall()
+        return [(row[0], row[1], row[2], self._unpack(row[3]) or {}) for row in rows]
+
+    def ack(self, cursor: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM broker_events WHERE cursor <= ?", (cursor,))
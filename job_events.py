@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Events after which a job produces nothing further
+TERMINAL_EVENTS = ("completed", "failed", "cancelled")
+
+
+class JobEvents:
+    """Fans job progress out from worker threads to asyncio subscribers"""
+
+    def __init__(self, history: int = 200):
+        self.history = history
+        self._lock = threading.Lock()
+        self._events: Dict[str, List[Dict]] = {}
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def publish(self, job_id: str, event_type: str, data: Optional[Dict] = None):
+        """Record an event and deliver it to every subscriber; safe from any thread"""
+        event = {"type": event_type, "job_id": job_id, "time": time.time()}
+        event.update(data or {})
+        with self._lock:
+            if event_type in TERMINAL_EVENTS:
+                # Late subscribers read the final state from the job store instead
+                self._events.pop(job_id, None)
+            else:
+                past = self._events.setdefault(job_id, [])
+                past.append(event)
+                del past[:-self.history]
+            subscribers = list(self._subscribers.get(job_id, []))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Queue receiving past and future events of a job; call from the event loop"""
+        queue = asyncio.Queue()
+        with self._lock:
+            for event in self._events.get(job_id, []):
+                queue.put_nowait(event)
+            self._subscribers.setdefault(job_id, []).append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        """Stop delivering events to a queue"""
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            subscribers[:] = [entry for entry in subscribers if entry[1] is not queue]
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
@@ -0,0 +1,154 @@
+import itertools
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+# Lower value is served first; FIFO within a class
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """Bounded priority queue drained by a fixed pool of worker threads"""
+
+    def __init__(self, handler: Callable[[str, Any], None], workers: int = 4,
+                 max_queue: int = 100, worker_teardown: Optional[Callable[[], None]] = None):
+        self.handler = handler
+        self.workers = workers
+        # Runs on each worker thread as it exits, e.g. to close thread-bound browsers
+        self.worker_teardown = worker_teardown
+        self.max_queue = max_queue
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._queued_by_priority = {name: 0 for name in PRIORITIES}
+        self._completed = 0
+        self._avg_duration = 0.0
+
+    def start(self):
+        """Start the worker threads"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop workers after their current job; queued jobs are dropped"""
+        self._drop_queued()
+        for _ in self._threads:
+            # A full queue would block the put, so make room first
+            while True:
+                try:
+                    self._queue.put_nowait((-1, next(self._sequence), None, None))
+                    break
+                except queue.Full:
+                    self._drop_queued()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _drop_queued(self):
+        """Empty the queue, keeping the per-priority counts in step"""
+        while True:
+            try:
+                _, _, priority, task = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if task is not None:
+                with self._lock:
+                    self._queued_by_priority[priority] -= 1
+
+    def submit(self, job_id: str, payload: Any, priority: str = "normal"):
+        """Queue a job for the handler, raising QueueFull instead of blocking when at capacity"""
+        self._put(priority, lambda: self.handler(job_id, payload))
+
+    def run(self, fn: Callable, *args, priority: str = "high") -> Future:
+        """Run any callable on a worker thread, returning a future for its result"""
+        future = Future()
+        
+        def task():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        
+        self._put(priority, task)
+        return future
+
+    def _put(self, priority: str, task: Callable[[], None]):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}")
+        # Count before enqueueing, or a worker could take the job and decrement first
+        with self._lock:
+            self._queued_by_priority[priority] += 1
+        try:
+            self._queue.put_nowait((PRIORITIES[priority], next(self._sequence), priority, task))
+        except queue.Full:
+            with self._lock:
+                self._queued_by_priority[priority] -= 1
+            raise QueueFull(self.retry_after())
+
+    def retry_after(self) -> int:
+        """Estimate seconds until a queue slot frees up"""
+        with self._lock:
+            avg = self._avg_duration or 5.0
+        return max(1, math.ceil(avg / max(1, self.workers)))
+
+    def stats(self) -> Dict:
+        """Queue depth and worker utilization"""
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "queued_by_priority": dict(self._queued_by_priority),
+                "running": self._running,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "completed": self._completed,
+                "avg_job_seconds": round(self._avg_duration, 3)
+            }
+
+    def _work(self):
+        """Worker loop: run tasks in priority order until stopped"""
+        try:
+            self._drain()
+        finally:
+            if self.worker_teardown:
+                self.worker_teardown()
+
+    def _drain(self):
+        while True:
+            _, _, priority, task = self._queue.get()
+            if task is None:
+                return
+            with self._lock:
+                self._queued_by_priority[priority] -= 1
+                self._running += 1
+            started = time.monotonic()
+            try:
+                task()
+            except Exception as e:
+                print(f"Task crashed in worker: {e}")
+            finally:
+                duration = time.monotonic() - started
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    # Exponential moving average keeps Retry-After responsive
+                    if self._avg_duration:
+                        self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+                    else:
+                        self._avg_duration = duration
@@ -0,0 +1,242 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# SQL placeholders matching FINISHED_STATUSES
+FINISHED_IN = "(" + ", ".join("?" * len(FINISHED_STATUSES)) + ")"
+
+
+class JobStore(ABC):
+    """Persistence interface for service jobs"""
+
+    @abstractmethod
+    def create(self, job_id: str, payload: Any, priority: str = "normal",
+               content_hash: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def find_by_hash(self, content_hash: str, max_age: float = 0) -> Optional[Dict]:
+        """Newest unfinished job with this content hash, or one completed within max_age seconds"""
+
+    @abstractmethod
+    def update(self, job_id: str, status: str, result: Optional[Dict] = None,
+               error: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def pending(self) -> List[Tuple[str, Any, str]]:
+        """Jobs that were queued or running, as (job_id, payload, priority)"""
+
+    @abstractmethod
+    def evict(self):
+        """Drop finished jobs past their TTL or beyond the size limit"""
+
+
+class MemoryJobStore(JobStore):
+    """Process-local store; nothing survives a restart"""
+
+    def __init__(self, ttl: float = 3600, max_jobs: int = 1000):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, payload: Any, priority: str = "normal",
+               content_hash: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {"status": "queued", "payload": payload, "priority": priority,
+                                  "content_hash": content_hash, "created_at": now,
+                                  "updated_at": now}
+
+    def find_by_hash(self, content_hash: str, max_age: float = 0) -> Optional[Dict]:
+        cutoff = time.time() - max_age
+        with self._lock:
+            matches = [
+                (job["created_at"], job_id, job["status"]) for job_id, job in self._jobs.items()
+                if job.get("content_hash") == content_hash and (
+                    job["status"] not in FINISHED_STATUSES or
+                    (max_age > 0 and job["status"] == "completed" and job["updated_at"] >= cutoff))
+            ]
+        if not matches:
+            return None
+        _, job_id, status = max(matches)
+        return {"job_id": job_id, "status": status}
+
+    def update(self, job_id: str, status: str, result: Optional[Dict] = None,
+               error: Optional[str] = None):
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {"priority": "normal", "created_at": time.time()})
+            job.update(status=status, result=result, error=error, updated_at=time.time())
+            if status in FINISHED_STATUSES:
+                job["payload"] = None
+        if status in FINISHED_STATUSES:
+            self.evict()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {"status": job["status"], "result": job.get("result"),
+                    "error": job.get("error")}
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def pending(self) -> List[Tuple[str, Any, str]]:
+        with self._lock:
+            return [(job_id, job["payload"], job["priority"])
+                    for job_id, job in self._jobs.items()
+                    if job["status"] not in FINISHED_STATUSES]
+
+    def evict(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            finished = sorted(
+                (job["updated_at"], job_id) for job_id, job in self._jobs.items()
+                if job["status"] in FINISHED_STATUSES
+            )
+            overflow = len(finished) - self.max_jobs
+            for i, (updated_at, job_id) in enumerate(finished):
+                if updated_at < cutoff or i < overflow:
+                    del self._jobs[job_id]
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite-backed store with zlib-compressed payloads and results"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL DEFAULT 'normal',
+            payload BLOB,
+            result BLOB,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            content_hash TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, updated_at);
+    """
+    INDEXES_AFTER_MIGRATION = """
+        CREATE INDEX IF NOT EXISTS idx_jobs_hash ON jobs (content_hash, created_at);
+    """
+
+    def __init__(self, path: str = "healer_jobs.db", ttl: float = 3600,
+                 max_jobs: int = 1000, evict_interval: float = 60):
+        self.path = path
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.evict_interval = evict_interval
+        self._last_evict = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+        self._conn.executescript(self.INDEXES_AFTER_MIGRATION)
+
+    def _migrate(self):
+        """Add columns introduced after a database file was created"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "content_hash" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")
+
+    @staticmethod
+    def _pack(value: Any) -> Optional[bytes]:
+        if value is None:
+            return None
+        return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def _unpack(blob: Optional[bytes]) -> Any:
+        if blob is None:
+            return None
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def create(self, job_id: str, payload: Any, priority: str = "normal",
+               content_hash: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, priority, payload, created_at, updated_at, "
+                "content_hash) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, priority, self._pack(payload), now, now, content_hash)
+            )
+
+    def find_by_hash(self, content_hash: str, max_age: float = 0) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, status FROM jobs WHERE content_hash = ? AND "
+                f"(status NOT IN {FINISHED_IN} OR (? > 0 AND status = 'completed' AND updated_at >= ?)) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (content_hash,) + FINISHED_STATUSES + (max_age, time.time() - max_age)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"job_id": row[0], "status": row[1]}
+
+    def update(self, job_id: str, status: str, result: Optional[Dict] = None,
+               error: Optional[str] = None):
+        # Finished jobs no longer need their payload for resumption
+        keep_payload = status not in FINISHED_STATUSES
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, "
+                "payload = CASE WHEN ? THEN payload ELSE NULL END WHERE job_id = ?",
+                (status, self._pack(result), error, time.time(), keep_payload, job_id)
+            )
+        if not keep_payload and time.monotonic() - self._last_evict > self.evict_interval:
+            self.evict()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, result, error FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "result": self._unpack(row[1]), "error": row[2]}
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def pending(self) -> List[Tuple[str, Any, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, payload, priority FROM jobs "
+                f"WHERE status NOT IN {FINISHED_IN} ORDER BY created_at",
+                FINISHED_STATUSES
+            ).fetchall()
+        return [(job_id, self._unpack(payload), priority) for job_id, payload, priority in rows]
+
+    def evict(self):
+        self._last_evict = time.monotonic()
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN {FINISHED_IN} AND updated_at < ?",
+                FINISHED_STATUSES + (time.time() - self.ttl,)
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE job_id IN ("
+                f"SELECT job_id FROM jobs WHERE status IN {FINISHED_IN} "
+                "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                FINISHED_STATUSES + (self.max_jobs,)
+            )
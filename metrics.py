@@ -0,0 +1,203 @@
+"""Minimal Prometheus text-format metrics.
+
+Counters and histograms write to a per-thread shard, so recording on the hot
+path takes no lock; shards are only summed when /metrics is scraped. Shards of
+finished threads are folded into a shared base, so short-lived threads do not
+accumulate.
+"""
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry: List["_Metric"] = []
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        return lines + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class _Sharded(_Metric):
+    """Keeps one dict per recording thread; only the owning thread writes to it"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict]] = []
+        # Totals of threads that have finished, only touched under the lock
+        self._base: Dict = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._fold_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _fold_finished(self):
+        """Merge shards of finished threads into the base; the caller holds the lock"""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                for key, value in shard.items():
+                    self._base[key] = self._merge(self._base.get(key), value)
+        self._shards = live
+
+    @abstractmethod
+    def _merge(self, total, value):
+        """Add one shard's value for a key to a running total (None when there is none yet)"""
+
+    def _snapshot(self) -> List[List]:
+        with self._shards_lock:
+            self._fold_finished()
+            base = [(key, self._merge(None, value)) for key, value in self._base.items()]
+            shards = [shard for _, shard in self._shards]
+        return [base] + [list(shard.items()) for shard in shards]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, total, value):
+        return (total or 0) + value
+
+    def _samples(self) -> List[str]:
+        totals: Dict[Tuple, float] = {}
+        for items in self._snapshot():
+            for key, value in items:
+                totals[key] = totals.get(key, 0) + value
+        return [f"{self.name}{self._labels(key)} {_number(value)}"
+                for key, value in sorted(totals.items())]
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        # Per-bucket counts, then sum and count
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = [0] * (len(self.buckets) + 2)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def _merge(self, total, value):
+        if total is None:
+            return list(value)
+        for i, count in enumerate(value):
+            total[i] += count
+        return total
+
+    def _samples(self) -> List[str]:
+        totals: Dict[Tuple, List[float]] = {}
+        for items in self._snapshot():
+            for key, state in items:
+                merged = totals.setdefault(key, [0] * len(state))
+                for i, value in enumerate(list(state)):
+                    merged[i] += value
+        lines = []
+        for key, state in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {_number(cumulative)}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{self._labels(key, inf)} {_number(state[-1])}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_number(state[-2])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_number(state[-1])}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value read from a callback at scrape time: a number, or {label tuple: number}"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.read = read
+
+    def _samples(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{self._labels(key)} {_number(v)}" for key, v in sorted(value.items())]
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Healing metrics shared by the runner, healer and service
+HEALS = Counter("healer_heals_total", "Selector recoveries by tier and outcome",
+                ("tier", "outcome"))
+OLLAMA_SECONDS = Histogram("healer_ollama_request_seconds", "Ollama request latency",
+                           ("model", "outcome"))
+OLLAMA_PROMPT_TOKENS = Counter("healer_ollama_prompt_tokens_total",
+                               "Prompt tokens evaluated by Ollama", ("model",))
+OLLAMA_COMPLETION_TOKENS = Counter("healer_ollama_completion_tokens_total",
+                                   "Tokens generated by Ollama", ("model",))
+OLLAMA_EVAL_SECONDS = Counter("healer_ollama_eval_seconds_total",
+                              "Time Ollama spent generating tokens; divide tokens by it for "
+                              "throughput", ("model",))
@@ -0,0 +1,141 @@
+"""Keeps healing models loaded in Ollama.
+
+Ollama loads a model on its first request and unloads it once its keep_alive
+runs out, so the first heal after a quiet spell pays the whole load time.
+ModelWarmer loads the configured models at startup and, while heals keep
+coming, pings them with a keep_alive sized to the longest recent gap between
+requests. Once a quiet spell outlasts that keep_alive it stops pinging, so
+Ollama frees the model's memory.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+import requests
+from prompt_budget import PromptBuilder
+
+
+class ModelWarmer:
+    """Loads models at startup and keeps them resident while traffic lasts"""
+
+    def __init__(self, ollama_url: str, models: List[str], min_keep_alive: float = 300,
+                 max_keep_alive: float = 3600, interval: float = 60):
+        self.ollama_url = ollama_url
+        self.models = models
+        # Bounds in seconds of the traffic-sized keep_alive
+        self.min_keep_alive = min_keep_alive
+        self.max_keep_alive = max_keep_alive
+        self.interval = interval
+        # Warm with the healer's num_ctx, otherwise the first heal reloads the model
+        self.prompts = PromptBuilder(ollama_url)
+        self._requests: Deque[float] = deque(maxlen=200)
+        self._pings: Dict[str, Dict] = {}
+        self._residency: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Warm every model, then keep them resident, on a background thread"""
+        if not self.models:
+            return
+        self._thread = threading.Thread(target=self._run, name="model-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def record_request(self):
+        """Note a heal-bearing request, which sizes keep_alive and keeps pings going"""
+        with self._lock:
+            self._requests.append(time.time())
+
+    def keep_alive(self) -> Optional[float]:
+        """Seconds to keep models loaded for the current traffic, or None to let them unload.
+
+        Models stay loaded across twice the longest recent gap between
+        requests, so sparse traffic gets a longer keep_alive than busy traffic;
+        once the quiet spell outlasts it, pings stop.
+        """
+        now = time.time()
+        with self._lock:
+            stamps = list(self._requests)
+        if not stamps:
+            return None
+        longest_gap = max((b - a for a, b in zip(stamps, stamps[1:])), default=0)
+        window = min(self.max_keep_alive, max(self.min_keep_alive, 2 * longest_gap + self.interval))
+        return window if now - stamps[-1] <= window else None
+
+    def ping(self, model: str, keep_alive: float) -> Dict:
+        """Load a model, or extend its residency, with an empty generate request"""
+        started = time.monotonic()
+        outcome = {"keep_alive": keep_alive, "at": time.time()}
+        try:
+            response = requests.post(f"{self.ollama_url}/api/generate", json={
+                "model": model,
+                "keep_alive": f"{int(keep_alive)}s",
+                "options": self.prompts.options(model),
+                "stream": False
+            }, timeout=300)
+            response.raise_for_status()
+            outcome["load_seconds"] = round(response.json().get("load_duration", 0) / 1e9, 3)
+        except Exception as e:
+            outcome["error"] = str(e)
+        outcome["seconds"] = round(time.monotonic() - started, 3)
+        with self._lock:
+            self._pings[model] = outcome
+        return outcome
+
+    def residency(self) -> Dict[str, Dict]:
+        """Which configured models Ollama holds in memory, from /api/ps"""
+        try:
+            response = requests.get(f"{self.ollama_url}/api/ps", timeout=2)
+            response.raise_for_status()
+            loaded = {entry.get("name") or entry.get("model"): entry
+                      for entry in response.json().get("models", [])}
+        except Exception as e:
+            return {model: {"resident": None, "error": str(e)} for model in self.models}
+
+        residency = {}
+        for model in self.models:
+            # Ollama reports tagged names; "llama3.2" is held as "llama3.2:latest"
+            entry = loaded.get(model) or loaded.get(f"{model}:latest")
+            residency[model] = {"resident": entry is not None}
+            if entry:
+                residency[model].update(expires_at=entry.get("expires_at"),
+                                        size_vram=entry.get("size_vram"))
+        with self._lock:
+            self._residency = residency
+        return residency
+
+    def cached_residency(self) -> Dict[str, Dict]:
+        """Residency as of the last check, without asking Ollama"""
+        with self._lock:
+            return dict(self._residency)
+
+    def status(self) -> Dict[str, Dict]:
+        """Residency of every model as of the last check, with its last ping, for /health.
+
+        Only reads what the warming loop recorded, so health probes never wait on Ollama;
+        `resident` is None until the first check.
+        """
+        with self._lock:
+            return {model: dict(self._residency.get(model, {"resident": None}),
+                                last_ping=self._pings.get(model))
+                    for model in self.models}
+
+    def _run(self):
+        for model in self.models:
+            outcome = self.ping(model, self.max_keep_alive)
+            if "error" in outcome:
+                print(f"⚠️ Warming {model} failed: {outcome['error']}")
+            else:
+                print(f"🔥 Warmed {model} in {outcome['seconds']}s")
+        self.residency()
+        while not self._stopped.wait(self.interval):
+            keep_alive = self.keep_alive()
+            if keep_alive is not None:
+                for model in self.models:
+                    self.ping(model, keep_alive)
+            self.residency()
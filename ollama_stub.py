@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Ollama-compatible stand-in server for deterministic healing load tests.
+
+Implements /api/generate (streamed or not), /api/show, /api/ps and /api/tags. Replies come from
+a script file or, by default, from the heuristic responder, and are paced
+like CPU inference: a fixed latency plus prompt and generation time at the
+configured token rates. Errors and hangs can be injected at given rates.
+
+    python ollama_stub.py --port 11435 --tokens-per-sec 30 --error-rate 0.05
+    OLLAMA_URL=http://localhost:11435 python service.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from heuristic_responder import HeuristicResponder, estimate_tokens
+
+
+class StubSettings:
+    """Pacing, failure injection and reply source of a stub server"""
+
+    def __init__(self, models: List[str] = ("llama3.2",), latency: float = 0.05,
+                 prompt_tokens_per_sec: float = 2000, tokens_per_sec: float = 40,
+                 parallel: int = 1, error_rate: float = 0.0, error_status: int = 500,
+                 hang_rate: float = 0.0, hang_seconds: float = 120,
+                 script: Optional[List[Dict]] = None, seed: Optional[int] = None,
+                 context_length: int = 8192, load_seconds: float = 0.0):
+        self.models = list(models)
+        # Reported by /api/show, which healers size their prompts to
+        self.context_length = context_length
+        # Paid by the first request after a model's keep_alive ran out, like a cold load
+        self.load_seconds = load_seconds
+        # Fixed per-request overhead, then prompt evaluation and generation time
+        self.latency = latency
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.tokens_per_sec = tokens_per_sec
+        # Requests generated at once; the rest queue, like OLLAMA_NUM_PARALLEL
+        self.parallel = parallel
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        # [{"match": regex, "response": text}]; entries without "match" answer anything in turn
+        self.script = script or []
+        self.seed = seed
+
+
+def load_script(path: str) -> List[Dict]:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def create_app(settings: StubSettings) -> FastAPI:
+    """Build the stub's FastAPI app"""
+    app = FastAPI(title="Ollama stub")
+    responder = HeuristicResponder()
+    rng = random.Random(settings.seed)
+    slots = asyncio.Semaphore(settings.parallel)
+    stats = {"requests": 0, "errors": 0, "hangs": 0, "in_flight": 0, "queued": 0}
+    unmatched = [entry for entry in settings.script if "match" not in entry]
+    turn = {"next": 0}
+    # Model name -> time.time() its keep_alive runs out
+    resident: Dict[str, float] = {}
+
+    async def load(model: str, keep_alive) -> float:
+        """Load the model if it is not resident and extend its residency; returns load seconds"""
+        now = time.time()
+        load_seconds = 0.0
+        if resident.get(model, 0) <= now:
+            load_seconds = settings.load_seconds
+            await asyncio.sleep(load_seconds)
+        seconds = _keep_alive_seconds(keep_alive)
+        if seconds == 0:
+            resident.pop(model, None)
+        else:
+            resident[model] = time.time() + seconds
+        return load_seconds
+
+    def reply_for(prompt: str, context: Optional[List[int]]) -> Dict:
+        for entry in settings.script:
+            if "match" in entry and re.search(entry["match"], prompt):
+                return {"response": entry["response"], "context": context or [0]}
+        if unmatched:
+            entry = unmatched[turn["next"] % len(unmatched)]
+            turn["next"] += 1
+            return {"response": entry["response"], "context": context or [0]}
+        return responder.respond(prompt, context)
+
+    def final_chunk(model: str, context: List[int], prompt_tokens: int, eval_tokens: int,
+                    prompt_seconds: float, eval_seconds: float, started: float,
+                    load_seconds: float) -> Dict:
+        return {
+            "model": model, "created_at": _now(), "response": "", "done": True,
+            "done_reason": "stop", "context": context,
+            "total_duration": int((time.monotonic() - started) * 1e9),
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_seconds * 1e9),
+            "eval_count": eval_tokens,
+            "eval_duration": int(eval_seconds * 1e9),
+        }
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{
+            "name": model, "model": model, "modified_at": _now(), "size": 0,
+            "digest": hashlib.sha256(model.encode("utf-8")).hexdigest(),
+            "details": {"format": "gguf", "family": "stub", "parameter_size": "0B"}
+        } for model in settings.models]}
+
+    @app.post("/api/show")
+    async def show(body: Dict):
+        model = body.get("model") or body.get("name", "")
+        if model not in settings.models:
+            return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+        return {"details": {"format": "gguf", "family": "stub", "parameter_size": "0B"},
+                "model_info": {"general.architecture": "stub",
+                               "stub.context_length": settings.context_length}}
+
+    @app.get("/api/ps")
+    async def ps():
+        now = time.time()
+        return {"models": [{
+            "name": model, "model": model, "size": 0, "size_vram": 0,
+            "digest": hashlib.sha256(model.encode("utf-8")).hexdigest(),
+            "expires_at": datetime.fromtimestamp(expires, timezone.utc).isoformat()
+        } for model, expires in sorted(resident.items()) if expires > now]}
+
+    @app.get("/stub/stats")
+    async def stub_stats():
+        return stats
+
+    @app.post("/api/generate")
+    async def generate(body: Dict):
+        model = body.get("model", "")
+        if model not in settings.models:
+            return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+        stats["requests"] += 1
+        started = time.monotonic()
+        if not body.get("prompt"):
+            # An empty prompt only loads the model, or unloads it with keep_alive 0
+            load_seconds = await load(model, body.get("keep_alive"))
+            return {"model": model, "created_at": _now(), "response": "", "done": True,
+                    "done_reason": "unload" if model not in resident else "load",
+                    "load_duration": int(load_seconds * 1e9),
+                    "total_duration": int((time.monotonic() - started) * 1e9)}
+
+        stats["queued"] += 1
+        await slots.acquire()
+        stats["queued"] -= 1
+        stats["in_flight"] += 1
+        release = True
+        try:
+            if rng.random() < settings.error_rate:
+                stats["errors"] += 1
+                await asyncio.sleep(settings.latency)
+                return JSONResponse({"error": "injected failure"}, status_code=settings.error_status)
+            if rng.random() < settings.hang_rate:
+                stats["hangs"] += 1
+                await asyncio.sleep(settings.hang_seconds)
+
+            load_seconds = await load(model, body.get("keep_alive"))
+            prompt = body.get("prompt", "")
+            reply = reply_for(prompt, body.get("context"))
+            prompt_tokens = estimate_tokens(prompt)
+            prompt_seconds = prompt_tokens / settings.prompt_tokens_per_sec
+            await asyncio.sleep(settings.latency + prompt_seconds)
+
+            text = reply["response"]
+            pieces = [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+            per_token = 1 / settings.tokens_per_sec
+            done = final_chunk(model, reply["context"], prompt_tokens, len(pieces),
+                               prompt_seconds, per_token * len(pieces), started, load_seconds)
+
+            if not body.get("stream", True):
+                await asyncio.sleep(per_token * len(pieces))
+                done.update(response=text, total_duration=int((time.monotonic() - started) * 1e9))
+                return done
+
+            async def stream():
+                try:
+                    for piece in pieces:
+                        await asyncio.sleep(per_token)
+                        yield json.dumps({"model": model, "created_at": _now(),
+                                          "response": piece, "done": False}) + "\n"
+                finally:
+                    stats["in_flight"] -= 1
+                    slots.release()
+                done["total_duration"] = int((time.monotonic() - started) * 1e9)
+                yield json.dumps(done) + "\n"
+
+            # The stream frees the generation slot once the last token is out
+            release = False
+            return StreamingResponse(stream(), media_type="application/x-ndjson")
+        finally:
+            if release:
+                stats["in_flight"] -= 1
+                slots.release()
+
+    return app
+
+
+def _keep_alive_seconds(value) -> float:
+    """Seconds of an Ollama keep_alive, a number or a duration such as 300s, 5m or 1h"""
+    if value is None or value == "":
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    match = re.fullmatch(r"(-?[\d.]+)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return 300.0
+    seconds = float(match.group(1)) * units[match.group(2) or "s"]
+    # A negative keep_alive keeps the model loaded indefinitely; ten years will do
+    return 10 * 365 * 86400.0 if seconds < 0 else seconds
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an Ollama-compatible stub for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", default="llama3.2", help="comma-separated model names")
+    parser.add_argument("--latency", type=float, default=0.05, help="fixed seconds per request")
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=2000)
+    parser.add_argument("--tokens-per-sec", type=float, default=40)
+    parser.add_argument("--parallel", type=int, default=1, help="requests generated at once")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=120)
+    parser.add_argument("--script", help='JSON list of {"match": regex, "response": text}')
+    parser.add_argument("--seed", type=int, help="seed for error and hang injection")
+    parser.add_argument("--context-length", type=int, default=8192,
+                        help="context window reported by /api/show")
+    parser.add_argument("--load-seconds", type=float, default=0.0,
+                        help="delay of the first request after a model's keep_alive expires")
+    args = parser.parse_args()
+
+    settings = StubSettings(
+        models=[name.strip() for name in args.models.split(",")],
+        latency=args.latency,
+        prompt_tokens_per_sec=args.prompt_tokens_per_sec,
+        tokens_per_sec=args.tokens_per_sec,
+        parallel=args.parallel,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds,
+        script=load_script(args.script) if args.script else None,
+        seed=args.seed,
+        context_length=args.context_length,
+        load_seconds=args.load_seconds
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""Generate mutated variants of a page for large-scale healing benchmarks.
+
+Starting from a base page and a test case that drives it, each variant gets
+a random mix of realistic breakages (id/class renames, wrapper insertion,
+attribute removal, text changes, sibling reordering) and optional DOM
+inflation to a target node count. Every variant is written as a
+healing_benchmark corpus case recording which selectors broke:
+
+    python page_mutator.py demo_page_original.html demo_test.json \\
+        --out generated_corpus --count 1000 --inflate 0,1000,10000 --seed 7
+
+Output is deterministic for a given seed; variant i does not depend on --count.
+"""
+
+import argparse
+import html
+import json
+import os
+import random
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+             "param", "source", "track", "wbr"}
+RAW_TEXT_TAGS = {"script", "style"}
+CONTAINER_TAGS = {"body", "div", "section", "main", "article", "header", "footer", "nav",
+                  "aside", "form", "ul"}
+REMOVABLE_ATTRS = ("name", "placeholder", "type", "title", "aria-label", "role", "href", "for")
+SYNONYMS = {"send": "submit", "submit": "send", "message": "note", "name": "full name",
+            "email": "e-mail address", "log": "sign", "sign": "log", "add": "put", "cart": "basket",
+            "search": "find", "continue": "next", "buy": "purchase", "contact": "reach",
+            "successfully": "", "sent": "delivered", "your": "the", "form": "request"}
+FILLER_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit",
+                "sed", "do", "eiusmod", "tempor", "incididunt", "labore", "magna", "aliqua")
+
+
+class Node:
+    """Minimal DOM node; tag is '#text', '#comment' or '#decl' for non-elements"""
+
+    def __init__(self, tag: str, attrs: Optional[Dict[str, Optional[str]]] = None,
+                 text: str = "", parent: Optional["Node"] = None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.text = text
+        self.parent = parent
+        self.children: List["Node"] = []
+
+    @property
+    def is_element(self) -> bool:
+        return not self.tag.startswith("#")
+
+    def append(self, child: "Node", index: Optional[int] = None):
+        child.parent = self
+        if index is None:
+            self.children.append(child)
+        else:
+            self.children.insert(index, child)
+
+    def element_children(self) -> List["Node"]:
+        return [child for child in self.children if child.is_element]
+
+    def iter(self):
+        """This node and every descendant element, in document order"""
+        if self.is_element:
+            yield self
+        for child in self.children:
+            yield from child.iter()
+
+    def text_content(self) -> str:
+        if self.tag == "#text":
+            return self.text
+        if self.tag in RAW_TEXT_TAGS or not self.is_element:
+            return ""
+        return "".join(child.text_content() for child in self.children)
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document")
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, dict(attrs))
+        self.current.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.append(Node(tag, dict(attrs)))
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.append(Node("#text", text=data))
+
+    def handle_comment(self, data):
+        self.current.append(Node("#comment", text=data))
+
+    def handle_decl(self, decl):
+        self.current.append(Node("#decl", text=decl))
+
+
+def parse_html(source: str) -> Node:
+    builder = _TreeBuilder()
+    builder.feed(source)
+    builder.close()
+    return builder.root
+
+
+def serialize(node: Node) -> str:
+    if node.tag == "#text":
+        raw = node.parent is not None and node.parent.tag in RAW_TEXT_TAGS
+        return node.text if raw else html.escape(node.text, quote=False)
+    if node.tag == "#comment":
+        return f"<!--{node.text}-->"
+    if node.tag == "#decl":
+        return f"<!{node.text}>"
+    inner = "".join(serialize(child) for child in node.children)
+    if node.tag == "#document":
+        return inner
+    attrs = "".join(f" {name}" if value is None else f' {name}="{html.escape(value)}"'
+                    for name, value in node.attrs.items())
+    if node.tag in VOID_TAGS:
+        return f"<{node.tag}{attrs}>"
+    return f"<{node.tag}{attrs}>{inner}</{node.tag}>"
+
+
+# --- CSS subset matching, enough to tell which test selectors a mutation breaks ---
+
+class UnsupportedSelector(ValueError):
+    """Selector uses syntax the offline matcher does not implement"""
+
+
+SIMPLE_RE = re.compile(r"""
+    (?P<tag>\*|[a-zA-Z][\w-]*)
+  | \#(?P<id>[\w-]+)
+  | \.(?P<cls>[\w-]+)
+  | \[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[*^$|~]?=)\s*
+        (?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\]\s]+))\s*)?\]
+  | :(?P<pseudo>nth-child|nth-of-type|has-text)\(\s*(?P<arg>"[^"]*"|'[^']*'|[^)]*?)\s*\)
+  | :(?P<simple>first-child|last-child)
+""", re.X)
+COMBINATOR_RE = re.compile(r"\s*([>+~])\s*|\s+")
+
+
+def _parse_compound(selector: str, pos: int) -> Tuple[List[Dict], int]:
+    conditions = []
+    while pos < len(selector):
+        match = SIMPLE_RE.match(selector, pos)
+        if not match or match.end() == pos:
+            break
+        conditions.append({k: v for k, v in match.groupdict().items() if v is not None})
+        pos = match.end()
+    if not conditions:
+        raise UnsupportedSelector(selector)
+    return conditions, pos
+
+
+def parse_selector(selector: str) -> List[List[Tuple[Optional[str], List[Dict]]]]:
+    """Parse a selector list into, per selector, (combinator, conditions) per compound"""
+    if ">>" in selector or re.match(r"^\w+=", selector.strip()):
+        raise UnsupportedSelector(selector)
+    parsed = []
+    for part in re.split(r",(?=(?:[^\"']*[\"'][^\"']*[\"'])*[^\"']*$)", selector):
+        part = part.strip()
+        compounds = []
+        pos = 0
+        combinator = None
+        while pos < len(part):
+            conditions, pos = _parse_compound(part, pos)
+            compounds.append((combinator, conditions))
+            match = COMBINATOR_RE.match(part, pos)
+            if match and match.end() < len(part):
+                combinator = match.group(1) or " "
+                if combinator in "+~":
+                    raise UnsupportedSelector(selector)
+                pos = match.end()
+            elif pos < len(part):
+                raise UnsupportedSelector(selector)
+        if not compounds:
+            raise UnsupportedSelector(selector)
+        parsed.append(compounds)
+    return parsed
+
+
+def _nth(node: Node, same_type: bool = False) -> int:
+    siblings = node.parent.element_children() if node.parent else [node]
+    if same_type:
+        siblings = [s for s in siblings if s.tag == node.tag]
+    return siblings.index(node) + 1
+
+
+def _matches_condition(node: Node, cond: Dict) -> bool:
+    if "tag" in cond:
+        return cond["tag"] == "*" or node.tag == cond["tag"].lower()
+    if "id" in cond:
+        return node.attrs.get("id") == cond["id"]
+    if "cls" in cond:
+        return cond["cls"] in (node.attrs.get("class") or "").split()
+    if "attr" in cond:
+        if cond["attr"] not in node.attrs:
+            return False
+        if "op" not in cond:
+            return True
+        actual = node.attrs[cond["attr"]] or ""
+        expected = cond.get("dq", cond.get("sq", cond.get("bare", "")))
+        op = cond["op"]
+        if op == "=":
+            return actual == expected
+        if op == "*=":
+            return expected in actual
+        if op == "^=":
+            return actual.startswith(expected)
+        if op == "$=":
+            return actual.endswith(expected)
+        if op == "~=":
+            return expected in actual.split()
+        return actual == expected or actual.startswith(expected + "-")
+    if "simple" in cond:
+        siblings = node.parent.element_children() if node.parent else [node]
+        return siblings[0 if cond["simple"] == "first-child" else -1] is node
+    arg = cond["arg"].strip("\"'")
+    if cond["pseudo"] == "has-text":
+        # Playwright matches text case-insensitively with collapsed whitespace
+        text = " ".join(node.text_content().split()).lower()
+        return " ".join(arg.split()).lower() in text
+    index = _nth(node, same_type=cond["pseudo"] == "nth-of-type")
+    if arg in ("odd", "even"):
+        return index % 2 == (1 if arg == "odd" else 0)
+    if not arg.isdigit():
+        raise UnsupportedSelector(arg)
+    return index == int(arg)
+
+
+def _matches(node: Node, compounds: List, index: int) -> bool:
+    combinator, conditions = compounds[index]
+    if not all(_matches_condition(node, cond) for cond in conditions):
+        return False
+    if index == 0:
+        return True
+    parent = node.parent
+    if combinator == ">":
+        return parent is not None and parent.is_element and _matches(parent, compounds, index - 1)
+    while parent is not None and parent.is_element:
+        if _matches(parent, compounds, index - 1):
+            return True
+        parent = parent.parent
+    return False
+
+
+def select(root: Node, selector: str) -> List[Node]:
+    """Elements matching a selector, in document order"""
+    parsed = parse_selector(selector)
+    return [node for node in root.iter()
+            if any(_matches(node, compounds, len(compounds) - 1) for compounds in parsed)]
+
+
+def selector_status(root: Node, selector: str, target: Node) -> str:
+    """ok, broken (no match), ambiguous, wrong_element or unknown (unsupported syntax)"""
+    try:
+        found = select(root, selector)
+    except UnsupportedSelector:
+        return "unknown"
+    if not found:
+        return "broken"
+    if len(found) > 1:
+        return "ambiguous"
+    return "ok" if found[0] is target else "wrong_element"
+
+
+def path_selector(node: Node) -> str:
+    """Structural selector that pins one element, used as benchmark ground truth"""
+    parts = []
+    while node.parent is not None and node.parent.is_element:
+        parts.append(f"{node.tag}:nth-child({_nth(node)})")
+        node = node.parent
+    parts.append(node.tag)
+    return " > ".join(reversed(parts))
+
+
+# --- Mutations; each returns a description of what it changed ---
+
+def _generated_name(rng: random.Random) -> str:
+    return "css-" + "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(6))
+
+
+def _pick(rng: random.Random, candidates: List[Node], targets: List[Node], k: int) -> List[Node]:
+    """Pick up to k nodes, favouring targets and their ancestors so breakage is likely"""
+    if not candidates:
+        return []
+    near = set()
+    for target in targets:
+        node = target
+        while node is not None and node.is_element:
+            near.add(id(node))
+            node = node.parent
+    favoured = [node for node in candidates if id(node) in near]
+    picked = []
+    for _ in range(k):
+        pool = favoured if favoured and rng.random() < 0.7 else candidates
+        choice = rng.choice(pool)
+        if choice not in picked:
+            picked.append(choice)
+    return picked
+
+
+def _body(root: Node) -> Node:
+    return next((node for node in root.iter() if node.tag == "body"), root)
+
+
+def rename_ids(root: Node, rng: random.Random, targets: List[Node]) -> str:
+    nodes = _pick(rng, [n for n in _body(root).iter() if n.attrs.get("id")], targets, 2)
+    renames = {}
+    for node in nodes:
+        renames[node.attrs["id"]] = node.attrs["id"] = _generated_name(rng)
+    for node in root.iter():
+        if node.attrs.get("for") in renames:
+            node.attrs["for"] = renames[node.attrs["for"]]
+    return f"renamed ids {sorted(renames)}"
+
+
+def rename_classes(root: Node, rng: random.Random, targets: List[Node]) -> str:
+    nodes = _pick(rng, [n for n in _body(root).iter() if n.attrs.get("class")], targets, 2)
+    renames = {}
+    for node in nodes:
+        for name in node.attrs["class"].split():
+            renames.setdefault(name, _generated_name(rng))
+    for node in root.iter():
+        if node.attrs.get("class"):
+            node.attrs["class"] = " ".join(renames.get(name, name)
+                                           for name in node.attrs["class"].split())
+        if node.tag == "style":
+            # Keep the page styled like a build tool renaming classes would
+            for text in node.children:
+                for old, new in renames.items():
+                    text.text = re.sub(rf"\.{re.escape(old)}\b", f".{new}", text.text)
+    return f"renamed classes {sorted(renames)}"
+
+
+def insert_wrappers(root: Node, rng: random.Random, targets: List[Node]) -> str:
+    body = _body(root)
+    nodes = _pick(rng, [n for n in body.iter() if n is not body and n.tag not in RAW_TEXT_TAGS],
+                  targets, 2)
+    for node in nodes:
+        parent = node.parent
+        wrapper = Node(rng.choice(("div", "span", "section")), {"class": _generated_name(rng)})
+        index = parent.children.index(node)
+        parent.children.remove(node)
+        wrapper.append(node)
+        parent.append(wrapper, index)
+    return f"wrapped {[node.tag for node in nodes]}"
+
+
+def remove_attributes(root: Node, rng: random.Random, targets: List[Node]) -> str:
+    candidates = [n for n in _body(root).iter() if any(a in n.attrs for a in REMOVABLE_ATTRS)
+                  or any(a.startswith(("data-", "aria-")) for a in n.attrs)]
+    removed = []
+    for node in _pick(rng, candidates, targets, 2):
+        names = [a for a in node.attrs if a in REMOVABLE_ATTRS or a.startswith(("data-", "aria-"))]
+        name = rng.choice(names)
+        del node.attrs[name]
+        removed.append(f"{node.tag}@{name}")
+    return f"removed attributes {removed}"
+
+
+def change_text(root: Node, rng: random.Random, targets: List[Node]) -> str:
+    texts = [child for node in _body(root).iter() if node.tag not in RAW_TEXT_TAGS
+             for child in node.children if child.tag == "#text" and child.text.strip()]
+    target_texts = [child for target in targets for child in target.children
+                    if child.tag == "#text" and child.text.strip()]
+    changed = []
+    for _ in range(2):
+        pool = target_texts if target_texts and rng.random() < 0.7 else texts
+        if not pool:
+            break
+        node = rng.choice(pool)
+        words = node.text.split()
+        reworded = [SYNONYMS.get(word.lower(), word) for word in words]
+        if reworded == words:
+            reworded = words[:-1] or [rng.choice(("Continue", "Go", "OK"))]
+        before = node.text.strip()
+        node.text = node.text.replace(before, " ".join(w for w in reworded if w) or "OK")
+        changed.append(before)
+    return f"changed text {changed}"
+
+
+def reorder_siblings(root: Node, rng: random.Random, targets: List[Node]) -> str:
+    parents = [n for n in _body(root).iter() if len(n.element_children()) > 1]
+    reordered = []
+    for parent in _pick(rng, parents, targets, 1):
+        elements = parent.element_children()
+        shuffled = elements[:]
+        rng.shuffle(shuffled)
+        slots = iter(shuffled)
+        parent.children = [next(slots) if child.is_element else child for child in parent.children]
+        reordered.append(parent.tag)
+    return f"reordered children of {reordered}"
+
+
+MUTATIONS: Dict[str, Callable[[Node, random.Random, List[Node]], str]] = {
+    "rename_ids": rename_ids,
+    "rename_classes": rename_classes,
+    "wrap": insert_wrappers,
+    "remove_attrs": remove_attributes,
+    "change_text": change_text,
+    "reorder": reorder_siblings,
+}
+
+
+def _filler(rng: random.Random, serial: int) -> Node:
+    """A small block of unrelated content, about a dozen nodes"""
+    block = Node(rng.choice(("div", "section", "aside")), {"class": _generated_name(rng)})
+    heading = Node("h4")
+    heading.append(Node("#text", text=f"{rng.choice(FILLER_WORDS).title()} {serial}"))
+    block.append(heading)
+    items = Node("ul")
+    for _ in range(rng.randint(2, 5)):
+        item = Node("li")
+        link = Node("a", {"href": f"#item-{serial}-{len(items.children)}"})
+        link.append(Node("#text", text=" ".join(rng.sample(FILLER_WORDS, 2))))
+        item.append(link)
+        items.append(item)
+    block.append(items)
+    return block
+
+
+def inflate(root: Node, rng: random.Random, node_count: int) -> int:
+    """Insert filler blocks at random places until the page has node_count elements"""
+    body = _body(root)
+    containers = [n for n in body.iter() if n.tag in CONTAINER_TAGS]
+    count = sum(1 for _ in root.iter())
+    serial = 0
+    while count < node_count:
+        block = _filler(rng, serial)
+        parent = rng.choice(containers)
+        parent.append(block, rng.randint(0, len(parent.children)))
+        containers.append(block)
+        count += sum(1 for _ in block.iter())
+        serial += 1
+    return count
+
+
+def find_targets(root: Node, steps: List[Dict]) -> List[Tuple[Dict, Node]]:
+    """Pair each step with the single element its selectors resolve to on the base page"""
+    found = []
+    for step in steps:
+        for selector in step.get("selectors", []):
+            try:
+                matches = select(root, selector)
+            except UnsupportedSelector:
+                continue
+            if len(matches) == 1:
+                found.append((step, matches[0]))
+                break
+        else:
+            print(f"Skipping step without a unique, supported selector: {step.get('description')}")
+    return found
+
+
+def make_variant(base_html: str, steps: List[Dict], seed: int, index: int,
+                 mutations: List[str], node_count: int = 0) -> Dict:
+    """Mutate the base page once; returns the variant's HTML, applied mutations and targets"""
+    rng = random.Random(f"{seed}-{index}")
+    root = parse_html(base_html)
+    targets = find_targets(root, steps)
+    nodes = [node for _, node in targets]
+
+    applied = []
+    for name in rng.sample(mutations, rng.randint(1, min(3, len(mutations)))):
+        applied.append({"kind": name, "detail": MUTATIONS[name](root, rng, nodes)})
+    if node_count:
+        inflate(root, rng, node_count)
+
+    case_targets = []
+    for step, node in targets:
+        selectors = step["selectors"]
+        target = {key: value for key, value in step.items() if key != "selectors"}
+        target.update(selector=selectors[0], alternatives=selectors[1:],
+                      truth=path_selector(node),
+                      breaks={selector: selector_status(root, selector, node)
+                              for selector in selectors})
+        case_targets.append(target)
+    return {"html": serialize(root), "mutations": applied,
+            "nodes": sum(1 for _ in root.iter()), "targets": case_targets}
+
+
+def generate_corpus(base_path: str, test_path: str, out_dir: str, count: int, seed: int = 0,
+                    mutations: Optional[List[str]] = None,
+                    inflate_sizes: Tuple[int, ...] = (0,)) -> Dict[str, int]:
+    """Write `count` benchmark cases for the base page; returns selector outcome totals"""
+    with open(base_path, "r") as f:
+        base_html = f.read()
+    with open(test_path, "r") as f:
+        steps = json.load(f)["steps"]
+    mutations = mutations or list(MUTATIONS)
+    stem = os.path.splitext(os.path.basename(base_path))[0]
+
+    os.makedirs(out_dir, exist_ok=True)
+    original = f"{stem}.html"
+    with open(os.path.join(out_dir, original), "w") as f:
+        f.write(base_html)
+
+    totals: Dict[str, int] = {}
+    for i in range(count):
+        size = inflate_sizes[i % len(inflate_sizes)]
+        variant = make_variant(base_html, steps, seed, i, mutations, size)
+        name = f"{stem}-{i:05d}"
+        with open(os.path.join(out_dir, f"{name}.html"), "w") as f:
+            f.write(variant["html"])
+        case = {"name": name, "seed": seed, "original": original, "mutated": f"{name}.html",
+                "nodes": variant["nodes"], "mutations": variant["mutations"],
+                "targets": variant["targets"]}
+        with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+            json.dump(case, f, indent=2)
+        for target in variant["targets"]:
+            status = target["breaks"][target["selector"]]
+            totals[status] = totals.get(status, 0) + 1
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate mutated page variants as benchmark cases")
+    parser.add_argument("base_page", help="HTML page to mutate")
+    parser.add_argument("test", help="test case JSON whose step selectors are tracked")
+    parser.add_argument("--out", default="generated_corpus")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mutations", default=",".join(MUTATIONS),
+                        help=f"comma-separated subset of {', '.join(MUTATIONS)}")
+    parser.add_argument("--inflate", default="0",
+                        help="comma-separated element counts to grow pages to, cycled over variants")
+    args = parser.parse_args()
+
+    mutations = [name.strip() for name in args.mutations.split(",") if name.strip()]
+    unknown = set(mutations) - set(MUTATIONS)
+    if unknown:
+        parser.error(f"unknown mutations: {', '.join(sorted(unknown))}")
+    sizes = tuple(int(size) for size in args.inflate.split(","))
+
+    totals = generate_corpus(args.base_page, args.test, args.out, args.count, args.seed,
+                             mutations, sizes)
+    print(f"🧬 Wrote {args.count} variants to {args.out}")
+    print(f"Primary selectors after mutation: {json.dumps(totals, sort_keys=True)}")
+
+
+if __name__ == "__main__":
+    main()
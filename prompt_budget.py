@@ -0,0 +1,166 @@
+"""Token-budgeted healing prompts.
+
+CPU inference time grows with prompt length, so the healing prompt is sized
+to the model instead of pasting a fixed amount of HTML. Each model's context
+window comes from Ollama's /api/show (falling back to a built-in table),
+tokens are estimated from character counts, and the budget goes first to the
+instructions and the failed step, then to alternatives, and whatever remains
+to DOM context. The static instructions come first so every prompt shares
+the same prefix, which Ollama can reuse from its cache.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import requests
+from dom_discovery import FRAME_DELIMITER
+
+# Context window per model family; Ollama truncates prompts beyond num_ctx
+CONTEXT_WINDOWS = {
+    "llama3.2": 8192,
+    "llama3.1": 8192,
+    "llama3": 8192,
+    "qwen2.5": 8192,
+    "qwen2.5-coder": 8192,
+    "mistral": 8192,
+    "gemma2": 8192,
+    "phi3": 4096,
+    "tinyllama": 2048,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Rough characters per token; tag-dense HTML tokenizes worse than prose
+PROSE_CHARS_PER_TOKEN = 4.0
+MARKUP_CHARS_PER_TOKEN = 3.0
+# Share of the budget alternatives may take before they are cut
+ALTERNATIVES_SHARE = 0.15
+# Fields longer than this are not a selector or description anymore
+MAX_FIELD_CHARS = 500
+# Below this, DOM context is too small to heal from
+MIN_DOM_CHARS = 1000
+# num_ctx is rounded up to this, leaving room for feedback turns on top of a prompt
+NUM_CTX_STEP = 1024
+
+STATIC_INSTRUCTIONS = f"""You are a web automation expert. A Playwright selector has failed and needs healing.
+Analyze the DOM context below and suggest the BEST selector that would work for the step. Consider:
+1. Element stability: prefer data-testid, aria-label, name, placeholder or visible text
+   over classes, and avoid dynamic IDs/classes and positions such as nth-child
+2. Uniqueness
+3. Semantic meaning
+
+Elements inside <#shadow-root> are matched by normal CSS selectors (open shadow roots are pierced).
+For elements inside an iframe, prefix the selector as shown in the FRAME comment, e.g.
+iframe#checkout{FRAME_DELIMITER}input[name="card"]
+
+Respond with ONLY a JSON object {{"selector": "<selector>"}}, no explanation. Example selectors:
+- [data-testid="submit-button"]
+- button:has-text("Submit")
+- .form-container >> input[type="email"]
+"""
+CLOSING = '\nEND DOM CONTEXT\nRespond with ONLY a JSON object {"selector": "<selector>"}.\n'
+
+
+# Context windows by (Ollama URL, model), shared by every builder in the process
+_context_windows: Dict[Tuple[str, str], int] = {}
+_context_windows_lock = threading.Lock()
+
+
+def estimate_tokens(text: str, chars_per_token: float = PROSE_CHARS_PER_TOKEN) -> int:
+    """Cheap token estimate from the character count"""
+    return int(len(text) / chars_per_token) + 1
+
+
+def _model_family(model: str) -> str:
+    return model.split(":", 1)[0].split("/")[-1]
+
+
+class PromptBuilder:
+    """Builds healing prompts that fit a per-model token budget"""
+
+    def __init__(self, ollama_url: str, max_prompt_tokens: Optional[int] = None,
+                 output_tokens: int = 256):
+        self.ollama_url = ollama_url
+        # Latency cap on prompt size, below the context window on CPU hosts
+        self.max_prompt_tokens = max_prompt_tokens or int(os.environ.get("HEALER_PROMPT_TOKENS", "3000"))
+        # Room left in the context window for the model's answer
+        self.output_tokens = output_tokens
+        self._static_tokens: Optional[int] = None
+
+    def context_window(self, model: str) -> int:
+        """The model's usable context window, looked up once per server and model"""
+        key = (self.ollama_url, model)
+        with _context_windows_lock:
+            if key in _context_windows:
+                return _context_windows[key]
+        configured = CONTEXT_WINDOWS.get(_model_family(model), DEFAULT_CONTEXT_WINDOW)
+        reported = self._reported_context_length(model)
+        window = min(configured, reported) if reported else configured
+        with _context_windows_lock:
+            _context_windows[key] = window
+        return window
+
+    def _reported_context_length(self, model: str) -> Optional[int]:
+        """Context length from Ollama's model metadata, if the server has it"""
+        try:
+            response = requests.post(f"{self.ollama_url}/api/show", json={"model": model}, timeout=5)
+            if response.status_code != 200:
+                return None
+            for key, value in response.json().get("model_info", {}).items():
+                if key.endswith(".context_length"):
+                    return int(value)
+        except Exception as e:
+            print(f"Model metadata lookup failed for {model}: {e}")
+        return None
+
+    def options(self, model: str) -> Dict:
+        """Ollama options sizing the KV cache to the prompt budget, not the whole context window"""
+        needed = self.budget(model) + self.output_tokens
+        rounded = -(-needed // NUM_CTX_STEP) * NUM_CTX_STEP
+        return {"num_ctx": min(self.context_window(model), rounded)}
+
+    def budget(self, model: str) -> int:
+        """Prompt tokens a healing prompt for this model may use"""
+        return min(self.max_prompt_tokens, self.context_window(model) - self.output_tokens)
+
+    def static_tokens(self) -> int:
+        """Token estimate of the fixed prompt parts, computed once"""
+        if self._static_tokens is None:
+            self._static_tokens = estimate_tokens(STATIC_INSTRUCTIONS + CLOSING)
+        return self._static_tokens
+
+    def _step_section(self, model: str, failed_selector: str, step_description: str,
+                      alternatives: Optional[List[str]]) -> Tuple[str, int]:
+        """The failed step's part of the prompt, alternatives cut to their share, and its tokens"""
+        section = (f"FAILED SELECTOR: {failed_selector[:MAX_FIELD_CHARS]}\n"
+                   f"STEP DESCRIPTION: {step_description[:MAX_FIELD_CHARS]}\n")
+        if alternatives:
+            allowance = int(self.budget(model) * ALTERNATIVES_SHARE * PROSE_CHARS_PER_TOKEN)
+            kept = []
+            for alternative in alternatives:
+                allowance -= len(alternative) + 4
+                if allowance < 0:
+                    break
+                kept.append(alternative[:MAX_FIELD_CHARS])
+            if kept:
+                section += f"Alternative selectors that were provided: {kept}\n"
+        return section, estimate_tokens(section)
+
+    def dom_chars(self, model: str, steps: List[Tuple[str, str, Optional[List[str]]]]) -> int:
+        """Characters of DOM context that fit next to the largest of the given steps.
+
+        `steps` are (failed_selector, description, alternatives); a batch heal
+        shares one DOM capture, so it must fit beside every step.
+        """
+        step_tokens = max((self._step_section(model, *step)[1] for step in steps), default=0)
+        remaining = self.budget(model) - self.static_tokens() - step_tokens
+        return max(int(remaining * MARKUP_CHARS_PER_TOKEN), MIN_DOM_CHARS)
+
+    def healing_prompt(self, model: str, failed_selector: str, step_description: str,
+                       dom_context: str, alternatives: Optional[List[str]] = None) -> str:
+        """Static instructions, then the step, then DOM context trimmed to the remaining budget"""
+        section, step_tokens = self._step_section(model, failed_selector, step_description,
+                                                  alternatives)
+        remaining = self.budget(model) - self.static_tokens() - step_tokens
+        dom_limit = max(int(remaining * MARKUP_CHARS_PER_TOKEN), MIN_DOM_CHARS)
+        return (f"{STATIC_INSTRUCTIONS}\n{section}\nDOM CONTEXT:\n"
+                f"{dom_context[:dom_limit]}{CLOSING}")
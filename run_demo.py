@@ -3,10 +3,11 @@
 Complete demo runner that starts server and runs healing demo
 """
 
+import os
 import time
 import subprocess
 import sys
-from simple_server import DemoServer
+from fixture_server import FixtureServer
 from healing_demo import run_healing_demo
 
 def main():
@@ -14,7 +15,7 @@ def main():
     print("=" * 50)
     
     # Start the demo server
-    server = DemoServer(port=8080)
+    server = FixtureServer(os.path.dirname(os.path.abspath(__file__)), port=8080)
     
     try:
         server.start()
@@ -1,34 +1,268 @@
 import json
+import os
 import requests
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from playwright.sync_api import Page
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+from dom_discovery import discover_dom, inspect_matches
+from prompt_budget import PromptBuilder
+from selector_parsing import SELECTOR_SCHEMA, extract_selector
+from selector_stability import score_selector, stable_selector
+from metrics import (HEALS, OLLAMA_SECONDS, OLLAMA_PROMPT_TOKENS, OLLAMA_COMPLETION_TOKENS,
+                     OLLAMA_EVAL_SECONDS)
+
+# Ollama requests of every healer in the process share one bounded pool, so
+# healers are cheap to create and concurrent requests stay capped
+OLLAMA_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("HEALER_OLLAMA_CONCURRENCY", "8")),
+    thread_name_prefix="ollama"
+)
+# How often a heal waiting on Ollama checks whether its caller gave up
+STOP_POLL_SECONDS = 0.25
+
+class AbortSignal(threading.Event):
+    """Event that, once set, also drops the streamed Ollama request it guards"""
+
+    def __init__(self):
+        super().__init__()
+        self._guard_lock = threading.Lock()
+        self._response = None
+
+    def set(self):
+        with self._guard_lock:
+            super().set()
+            response, self._response = self._response, None
+        if response is not None:
+            _drop_response(response)
+
+    def guard(self, response: Optional[requests.Response]) -> bool:
+        """Close `response` when the signal is set (None releases it); False if already set"""
+        with self._guard_lock:
+            if self.is_set():
+                return False
+            self._response = response
+            return True
+
+
+def _drop_response(response: requests.Response):
+    """Close a streamed response from any thread, so Ollama sees the client leave"""
+    try:
+        # Wakes a read blocked on another thread (urllib3 2.3+); close() alone would not
+        response.raw.shutdown()
+    except Exception:
+        pass
+    response.close()
+
 
 class SelectorHealer:
-    def __init__(self, ollama_url: str = "http://localhost:11434"):
-        self.ollama_url = ollama_url
+    def __init__(self, ollama_url: Optional[str] = None,
+                 max_attempts: int = 3, heal_timeout: float = 60.0,
+                 durable_selectors: bool = True, model: Optional[str] = None,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        # OLLAMA_URL points every healer at another server, e.g. ollama_stub.py
+        self.ollama_url = ollama_url or os.environ.get("OLLAMA_URL", "http://localhost:11434")
+        self.model = model or os.environ.get("OLLAMA_MODEL", "llama3.2")
+        # Sizes prompts to the model's context window and the latency budget
+        self.prompts = PromptBuilder(self.ollama_url)
+        # Budgets for the validate-and-retry loop of a single heal
+        self.max_attempts = max_attempts
+        self.heal_timeout = heal_timeout
+        # Rewrite working suggestions into the most stable selector for the same element
+        self.durable_selectors = durable_selectors
+        # Only the Ollama request runs off-thread; the sync Playwright page
+        # must stay on the thread that owns it.
+        self._executor = executor or OLLAMA_EXECUTOR
         
     def heal_selector(self, page: Page, failed_selector: str, step_description: str, 
-                     alternative_selectors: List[str] = None) -> Optional[str]:
-        """Main method to heal a failed selector"""
+                     alternative_selectors: List[str] = None,
+                     step: Optional[Dict] = None,
+                     timeout: Optional[float] = None,
+                     should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        """Main method to heal a failed selector.
+
+        `timeout` overrides heal_timeout; once `should_stop` returns True the
+        heal gives up and its Ollama request is dropped.
+        """
+        abort = AbortSignal() if should_stop else None
+        pending = self.start_healing(page, failed_selector, step_description,
+                                     alternative_selectors, abort=abort)
+        try:
+            return self.finish_healing(page, pending, step, timeout=timeout,
+                                       should_stop=should_stop)
+        finally:
+            if abort:
+                abort.set()
+
+    def start_healing(self, page: Page, failed_selector: str, step_description: str,
+                      alternative_selectors: List[str] = None,
+                      abort: Optional[AbortSignal] = None) -> Future:
+        """Capture DOM context now and query Ollama in the background.
+
+        A speculative heal passes `abort`; setting it drops the Ollama request
+        even while it generates, which Future.cancel() cannot do once it runs.
+        """
         
-        # Get page context
-        dom_context = self._get_dom_context(page, failed_selector)
+        # Get as much page context as the prompt budget leaves room for
+        max_chars = self.prompts.dom_chars(self.model, [(failed_selector, step_description,
+                                                         alternative_selectors)])
+        dom_context = self._get_dom_context(page, failed_selector, max_chars)
         
         # Prepare prompt for Ollama
         prompt = self._create_healing_prompt(failed_selector, step_description, 
                                            dom_context, alternative_selectors)
         
-        # Get suggestion from Ollama
-        suggested_selector = self._query_ollama(prompt)
+        # Get suggestion from Ollama without blocking the caller
+        return self._executor.submit(self._query_ollama, prompt, abort=abort)
+
+    def heal_batch(self, page: Page, items: List[Dict], timeout: Optional[float] = None,
+                   should_stop: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        """Heal several selectors on one loaded page, sharing a single DOM capture.
+
+        Each item has failed_selector, description and optionally alternatives,
+        action and expected_text; all Ollama requests are started before any
+        suggestion is validated. With `timeout` the whole batch shares that
+        budget, otherwise each item gets heal_timeout. Each result reports
+        `seconds`, from submitting its query until Ollama answered, and
+        `validation_seconds` spent validating and repairing the answer. Once
+        `should_stop` returns True the remaining items are dropped, their
+        Ollama requests included, and only finished items are returned.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        max_chars = self.prompts.dom_chars(self.model, [
+            (item["failed_selector"], item["description"], item.get("alternatives"))
+            for item in items])
+        dom_context = self._get_dom_context(page, "", max_chars)
+        pending = []
+        # Answer times are taken as each query finishes, not when its turn to be validated comes
+        answered: Dict[int, float] = {}
+        for index, item in enumerate(items):
+            prompt = self._create_healing_prompt(item["failed_selector"], item["description"],
+                                                 dom_context, item.get("alternatives"))
+            abort = AbortSignal() if should_stop else None
+            future = self._executor.submit(self._query_ollama, prompt, abort=abort)
+            pending.append((item, time.monotonic(), future, abort))
+            future.add_done_callback(lambda _, index=index: answered.setdefault(index, time.monotonic()))
+        
+        results = []
+        for index, (item, submitted, future, abort) in enumerate(pending):
+            if should_stop and should_stop():
+                print(f"Batch heal stopped with {len(pending) - index} items left")
+                for *_, left in pending[index:]:
+                    left.set()
+                break
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            validating = time.monotonic()
+            healed = self.finish_healing(page, future, item, timeout=remaining,
+                                         should_stop=should_stop)
+            finished = time.monotonic()
+            # A query still running when the heal gave up counts as waited on until then
+            answer = answered.get(index, finished)
+            results.append({
+                "failed_selector": item["failed_selector"],
+                "healed_selector": healed,
+                "seconds": round(answer - submitted, 3),
+                "validation_seconds": round(finished - max(answer, validating), 3)
+            })
+        return results
+
+    def finish_healing(self, page: Page, pending: Future, step: Optional[Dict] = None,
+                       timeout: Optional[float] = None,
+                       should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        """Wait for a started heal, validating and repairing its suggestion.
+
+        `timeout` overrides heal_timeout for this heal, e.g. to fit a test's
+        deadline; the heal gives up as soon as `should_stop` returns True.
+        """
+        healed = self._repair_suggestion(page, pending, step,
+                                         self.heal_timeout if timeout is None else timeout,
+                                         should_stop)
+        if healed and self.durable_selectors:
+            healed = self._make_durable(page, healed, step)
+        HEALS.inc(tier="llm", outcome="success" if healed else "failed")
+        return healed
+
+    def _repair_suggestion(self, page: Page, pending: Future, step: Optional[Dict],
+                           timeout: float,
+                           should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        """Validate suggestions, feeding failure reasons back until one works or a budget runs out"""
+        deadline = time.monotonic() + timeout
+        reply = self._await_reply(pending, deadline, should_stop)
         
-        # Validate the suggested selector
-        if suggested_selector and self._validate_selector(page, suggested_selector):
-            return suggested_selector
+        tried = []
+        for attempt in range(1, self.max_attempts + 1):
+            if not reply:
+                return None
+            if should_stop and should_stop():
+                print("Healing stopped before validation")
+                return None
+            suggested_selector = extract_selector(reply["response"])
+            
+            # Validate the suggested selector; malformed output never reaches the page
+            if suggested_selector is None:
+                suggested_selector = reply["response"][:200]
+                reason = "the response did not contain a valid selector"
+            else:
+                reason = self._check_selector(page, suggested_selector, step)
+                if reason is None:
+                    return suggested_selector
+                tried.append(suggested_selector)
+            
+            print(f"Suggested selector rejected ({attempt}/{self.max_attempts}): "
+                  f"{suggested_selector} - {reason}")
+            remaining = deadline - time.monotonic()
+            if attempt == self.max_attempts or remaining <= 0:
+                break
+            
+            # Feed the reason back, reusing the model's context from the last turn
+            reply = self._query_ollama(
+                self._create_feedback_prompt(suggested_selector, reason, tried),
+                context=reply.get("context"),
+                timeout=min(30, remaining)
+            )
             
         return None
     
-    def _get_dom_context(self, page: Page, failed_selector: str) -> str:
+    def _await_reply(self, pending: Future, deadline: float,
+                     should_stop: Optional[Callable[[], bool]]) -> Optional[Dict]:
+        """Wait for Ollama's reply until the deadline, or until should_stop returns True"""
+        while True:
+            remaining = max(0.0, deadline - time.monotonic())
+            wait = min(remaining, STOP_POLL_SECONDS) if should_stop else remaining
+            try:
+                return pending.result(timeout=wait)
+            except FutureTimeoutError:
+                if should_stop and should_stop():
+                    print("Healing stopped while waiting for Ollama")
+                    return None
+                if wait >= remaining:
+                    print("Healing timed out waiting for Ollama")
+                    return None
+
+    def _make_durable(self, page: Page, selector: str,
+                      step: Optional[Dict] = None) -> str:
+        """Swap a working selector for a more stable one on the same element, if it also works"""
+        try:
+            durable = stable_selector(page, selector, min_gain=0.1)
+        except Exception as e:
+            print(f"Stable selector lookup failed: {e}")
+            return selector
+        if durable is None or self._check_selector(page, durable, step) is not None:
+            return selector
+        print(f"Rewrote {selector} ({score_selector(selector)}) as {durable} ({score_selector(durable)})")
+        return durable
+
+    def _get_dom_context(self, page: Page, failed_selector: str,
+                         max_chars: int = 8000) -> str:
         """Extract relevant DOM context around the failed selector area"""
+        try:
+            # Walk every frame and open shadow root in one script per frame
+            return discover_dom(page, max_chars=max_chars)
+        except Exception as e:
+            print(f"DOM discovery failed, falling back to page content: {e}")
+
         try:
             # Get page HTML and find similar elements
             html = page.content()
@@ -37,68 +271,132 @@ class SelectorHealer:
             body_start = html.find('<body')
             body_end = html.find('</body>') + 7
             if body_start != -1 and body_end != -1:
-                body_content = html[body_start:body_end]
                 # Limit size for LLM
-                return body_content[:8000] if len(body_content) > 8000 else body_content
+                return html[body_start:body_end][:max_chars]
             
-            return html[:8000]
+            return html[:max_chars]
         except:
             return ""
     
     def _create_healing_prompt(self, failed_selector: str, step_description: str, 
                               dom_context: str, alternatives: List[str] = None) -> str:
-        """Create a structured prompt for Ollama"""
-        
-        alternatives_text = ""
-        if alternatives:
-            alternatives_text = f"\nAlternative selectors that were provided: {alternatives}"
-        
-        return f"""You are a web automation expert. A Playwright selector has failed and needs healing.
-
-FAILED SELECTOR: {failed_selector}
-STEP DESCRIPTION: {step_description}
-{alternatives_text}
+        """Create a structured prompt for Ollama, fitted to the model's token budget"""
+        return self.prompts.healing_prompt(self.model, failed_selector, step_description,
+                                           dom_context, alternatives)
 
-DOM CONTEXT:
-{dom_context}
+    def _create_feedback_prompt(self, selector: str, reason: str, tried: List[str]) -> str:
+        """Create a follow-up prompt explaining why the last suggestion failed"""
+        return f"""The selector {selector} did not work: {reason}.
+Selectors already tried: {tried}
 
-Analyze the DOM and suggest the BEST selector that would work for this step. Consider:
-1. Element stability (avoid dynamic IDs/classes)
-2. Uniqueness 
-3. Semantic meaning
-
-Respond with ONLY the selector string, no explanation. Examples:
-- [data-testid="submit-button"]
-- button:has-text("Submit")
-- .form-container >> input[type="email"]
+Suggest a different selector for the same element.
+Respond with ONLY a JSON object {{"selector": "<selector>"}}, no explanation.
 """
 
-    def _query_ollama(self, prompt: str, model: str = "llama3.2") -> Optional[str]:
-        """Send prompt to Ollama and get response"""
+    def _query_ollama(self, prompt: str, model: Optional[str] = None,
+                      context: Optional[List[int]] = None,
+                      timeout: float = 30,
+                      abort: Optional[AbortSignal] = None) -> Optional[Dict]:
+        """Send prompt to Ollama in JSON mode and get the raw response, its context and prompt size.
+
+        With `abort` the reply is streamed, so setting it ends the request early.
+        """
+        model = model or self.model
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "format": SELECTOR_SCHEMA,
+            "stream": abort is not None,
+            "options": self.prompts.options(model)
+        }
+        if context:
+            # Continue the previous turn so Ollama reuses its evaluated prompt
+            payload["context"] = context
+        
+        started = time.monotonic()
         try:
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=30
-            )
+            if abort is None:
+                response = requests.post(
+                    f"{self.ollama_url}/api/generate",
+                    json=payload,
+                    timeout=timeout
+                )
+                result = response.json() if response.status_code == 200 else None
+            else:
+                result = self._stream_ollama(payload, timeout, abort)
             
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "").strip()
+            if result is not None:
+                OLLAMA_SECONDS.observe(time.monotonic() - started, model=model, outcome="ok")
+                OLLAMA_PROMPT_TOKENS.inc(result.get("prompt_eval_count", 0), model=model)
+                OLLAMA_COMPLETION_TOKENS.inc(result.get("eval_count", 0), model=model)
+                OLLAMA_EVAL_SECONDS.inc(result.get("eval_duration", 0) / 1e9, model=model)
+                return {
+                    "response": result.get("response", "").strip(),
+                    "context": result.get("context"),
+                    "prompt_tokens": result.get("prompt_eval_count", 0)
+                }
                 
         except Exception as e:
-            print(f"Ollama query failed: {e}")
-            
+            if abort is None or not abort.is_set():
+                print(f"Ollama query failed: {e}")
+        
+        if abort is not None and abort.is_set():
+            OLLAMA_SECONDS.observe(time.monotonic() - started, model=model, outcome="aborted")
+            return None
+        OLLAMA_SECONDS.observe(time.monotonic() - started, model=model, outcome="error")
+        return None
+
+    def _stream_ollama(self, payload: Dict, timeout: float,
+                       abort: AbortSignal) -> Optional[Dict]:
+        """Read a streamed generate reply into its final chunk, or None if aborted or failed"""
+        if abort.is_set():
+            return None
+        with requests.post(f"{self.ollama_url}/api/generate", json=payload,
+                           stream=True, timeout=timeout) as response:
+            if response.status_code != 200 or not abort.guard(response):
+                return None
+            try:
+                pieces = []
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        return None
+                    pieces.append(chunk.get("response", ""))
+                    if chunk.get("done"):
+                        return dict(chunk, response="".join(pieces))
+            finally:
+                # Setting the signal later must not touch a connection back in the pool
+                abort.guard(None)
         return None
     
-    def _validate_selector(self, page: Page, selector: str) -> bool:
+    def _validate_selector(self, page: Page, selector: str,
+                           step: Optional[Dict] = None) -> bool:
         """Test if the suggested selector works"""
+        return self._check_selector(page, selector, step) is None
+
+    def _check_selector(self, page: Page, selector: str,
+                        step: Optional[Dict] = None) -> Optional[str]:
+        """Return why a selector cannot perform the step, or None if it can"""
+        step = step or {}
+        action = step.get('action')
+        expected_text = step.get('expected_text') if action == 'assert_text' else None
         try:
-            element = page.locator(selector).first
-            return element.count() > 0
-        except:
-            return False
\ No newline at end of file
+            state = inspect_matches(page, selector, expected_text)
+        except Exception as e:
+            return f"invalid selector ({str(e).splitlines()[0]})"
+        
+        if state["count"] == 0:
+            return "zero matches"
+        if state["count"] > 1:
+            return f"{state['count']} matches, the selector must be unique"
+        if action and not state["visible"]:
+            return "element is hidden"
+        if action == 'click' and not state["enabled"]:
+            return "element is disabled"
+        if action in ('fill', 'type') and not state["editable"]:
+            return f"element is not editable, {action} needs a text input"
+        if action == 'assert_text' and not state["has_text"]:
+            return f"element does not contain the text '{expected_text}'"
+        return None
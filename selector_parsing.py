@@ -0,0 +1,130 @@
+import json
+import re
+from typing import Iterator, Optional
+from dom_discovery import split_frame_selector
+
+# JSON schema passed as Ollama's `format` so the model answers {"selector": "..."}
+SELECTOR_SCHEMA = {
+    "type": "object",
+    "properties": {"selector": {"type": "string"}},
+    "required": ["selector"]
+}
+
+FENCE_RE = re.compile(r"```[\w-]*\s*(.*?)```", re.S)
+INLINE_CODE_RE = re.compile(r"`([^`\n]+)`")
+JSON_OBJECT_RE = re.compile(r"\{.*?\}", re.S)
+PREFIX_RE = re.compile(
+    r"^(?:[-*•]\s+|\d+[.)]\s+)?"
+    r"(?:(?:the |best |suggested |healed |new |css |playwright )*(?:selector|answer)\s*(?:is)?\s*[:=]?\s*)?",
+    re.I
+)
+ENGINE_RE = re.compile(r"^(?:css|xpath|text|id|data-testid|role|nth|internal:[\w-]+)=.+", re.S)
+QUOTED_RE = re.compile(r"'[^']*'|\"[^\"]*\"")
+PROSE_WORDS = {"the", "is", "are", "use", "should", "this", "would", "will", "try", "it",
+               "selector", "element", "here", "which", "that", "because", "cannot", "not"}
+# Bare words in a CSS part must be tag names, otherwise the part is prose. Every
+# HTML element counts, plus the SVG and MathML roots and common SVG shapes.
+HTML_TAGS = {"a", "abbr", "address", "area", "article", "aside", "audio", "b", "base",
+             "bdi", "bdo", "blockquote", "body", "br", "button", "canvas", "caption",
+             "cite", "code", "col", "colgroup", "data", "datalist", "dd", "del",
+             "details", "dfn", "dialog", "div", "dl", "dt", "em", "embed", "fieldset",
+             "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5",
+             "h6", "head", "header", "hgroup", "hr", "html", "i", "iframe", "img",
+             "input", "ins", "kbd", "label", "legend", "li", "link", "main", "map",
+             "mark", "menu", "meta", "meter", "nav", "noscript", "object", "ol",
+             "optgroup", "option", "output", "p", "picture", "pre", "progress", "q",
+             "rp", "rt", "ruby", "s", "samp", "script", "search", "section", "select",
+             "slot", "small", "source", "span", "strong", "style", "sub", "summary",
+             "sup", "table", "tbody", "td", "template", "textarea", "tfoot", "th",
+             "thead", "time", "title", "tr", "track", "u", "ul", "var", "video", "wbr"}
+HTML_TAGS |= {"svg", "math", "circle", "ellipse", "g", "line", "path", "polygon",
+              "polyline", "rect", "tspan"}
+CSS_START = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ*#.[:")
+CLOSING = {")": "(", "]": "["}
+
+
+def extract_selector(text: Optional[str]) -> Optional[str]:
+    """Pull the first syntactically valid selector out of a model response"""
+    if not text:
+        return None
+    for candidate in _candidates(text.strip()):
+        candidate = _clean(candidate)
+        if is_valid_selector(candidate):
+            return candidate
+    return None
+
+
+def _candidates(text: str) -> Iterator[str]:
+    """Yield possible selectors, most trustworthy first"""
+    for blob in [text] + JSON_OBJECT_RE.findall(text):
+        try:
+            data = json.loads(blob)
+        except ValueError:
+            continue
+        if isinstance(data, dict) and isinstance(data.get("selector"), str):
+            yield data["selector"]
+        elif isinstance(data, str):
+            yield data
+
+    for block in FENCE_RE.findall(text):
+        yield from block.splitlines()
+    yield from INLINE_CODE_RE.findall(text)
+    yield from text.splitlines()
+
+
+def _clean(candidate: str) -> str:
+    """Strip list markers, 'Selector:' labels, wrapping quotes and trailing punctuation"""
+    candidate = PREFIX_RE.sub("", candidate.strip()).strip().strip("`").strip()
+    if len(candidate) > 1 and candidate[0] == candidate[-1] and candidate[0] in "'\"":
+        candidate = candidate[1:-1].strip()
+    return candidate.rstrip(".,;").strip()
+
+
+def is_valid_selector(selector: Optional[str]) -> bool:
+    """Cheap syntax check for CSS/Playwright selectors before touching the browser"""
+    if not selector or len(selector) > 500 or "\n" in selector:
+        return False
+    for frame_part in split_frame_selector(selector):
+        for part in frame_part.split(">>"):
+            if not _is_valid_part(part.strip()):
+                return False
+    return True
+
+
+def _is_valid_part(part: str) -> bool:
+    """Validate one `>>`-chained selector part"""
+    if not part:
+        return False
+    if ENGINE_RE.match(part) or part.startswith("//") or part.startswith("(//"):
+        return _is_balanced(part)
+    if part[0] not in CSS_START or part[-1] in "#.>+~,":
+        return False
+    words = set(QUOTED_RE.sub("", part).lower().split())
+    if words & PROSE_WORDS:
+        return False
+    if all(word.isalpha() for word in words) and not words <= HTML_TAGS:
+        return False
+    return _is_balanced(part)
+
+
+def _is_balanced(part: str) -> bool:
+    """Check that brackets, parentheses and quotes are closed"""
+    stack = []
+    quote = None
+    escaped = False
+    for char in part:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([":
+            stack.append(char)
+        elif char in CLOSING:
+            if not stack or stack.pop() != CLOSING[char]:
+                return False
+    return not stack and quote is None
@@ -0,0 +1,355 @@
+"""Selector stability scoring and durable selector generation.
+
+Selectors anchored on test ids, accessible roles and names, labels or
+placeholders survive redesigns far better than positional or class-based
+ones. `score_selector` predicts how likely a selector is to survive the next
+deploy, and `stable_selector` rewrites a working selector into the most
+stable unique selector for the same element, so healed selectors stop
+breaking again. Run on a test file to audit its selectors:
+
+    python selector_stability.py demo_test.json
+"""
+
+import argparse
+import json
+import re
+from typing import List, Optional
+from playwright.sync_api import Page
+from dom_discovery import FRAME_DELIMITER, resolve_locator, split_frame_selector
+
+# Stability of each kind of anchor, from 0 (breaks on any change) to 1
+ANCHOR_SCORES = {
+    "test_id": 1.0,
+    "role_name": 0.9,
+    "aria_label": 0.85,
+    "id": 0.8,
+    "name": 0.8,
+    "label": 0.75,
+    "placeholder": 0.7,
+    "text": 0.6,
+    "attribute": 0.5,
+    "class": 0.45,
+    "role": 0.4,
+    "tag": 0.3,
+    "generated": 0.15,
+    "xpath": 0.1,
+}
+# Any positional step (nth-child, nth=, :first-child) caps the whole selector
+POSITIONAL_CAP = 0.2
+# Each compound beyond the first is one more thing a redesign can break
+COMBINATOR_PENALTY = 0.03
+
+TEST_ID_ATTRS = ("data-testid", "data-test-id", "data-test", "data-qa", "data-cy")
+POSITIONAL_RE = re.compile(r":nth-(?:child|of-type|last-child|last-of-type|match)\(|"
+                           r":(?:first|last|only)-(?:child|of-type)|^nth=")
+ATTR_RE = re.compile(r"\[\s*([\w-]+)\s*(?:[~|^$*]?=\s*(\"(?:[^\"\\]|\\.)*\"|'[^']*'|[^\]\s]+)\s*\w?)?\s*\]")
+ID_RE = re.compile(r"#((?:[\w-]|\\.)+)")
+CLASS_RE = re.compile(r"\.((?:[\w-]|\\.)+)")
+TEXT_RE = re.compile(r":(?:has-text|text|text-is|text-matches)\(|^text=|^\"|^'")
+ROLE_ENGINE_RE = re.compile(r"^role=([\w-]+)(.*)$")
+# Names emitted by CSS-in-JS, CSS modules and frameworks, or carrying counters
+# or hashes. Hash-like means a segment of 8+ hex characters, or one with two or
+# more digits mixed into letters; a short trailing number (address2, user123)
+# is how people name things.
+GENERATED_RE = re.compile(
+    r"^(?:css|sc|jsx|emotion|styled|svelte|ember|ng|mui|chakra|tw)-|"
+    r"\d{4,}|"
+    r"__[A-Za-z0-9]{5,}$|"
+    r"(?:^|[-_])(?=[0-9a-f]*[0-9])(?=[0-9a-f]*[a-f])[0-9a-f]{8,}(?:$|[-_])|"
+    r"(?:^|[-_])(?=(?:[A-Za-z]*[0-9]){2})(?=[A-Za-z0-9]*[0-9][A-Za-z])[A-Za-z0-9]{5,}(?:$|[-_])|"
+    r"^[0-9a-f]{8}-"
+)
+
+
+def is_generated_name(name: str) -> bool:
+    """Whether an id or class looks machine-generated and likely to change"""
+    name = name.replace("\\", "")
+    return bool(GENERATED_RE.search(name)) or not re.search(r"[A-Za-z]", name)
+
+
+def split_compounds(selector: str) -> List[str]:
+    """Split a CSS or Playwright selector into compounds at combinators, respecting quotes and brackets"""
+    # Playwright chaining (`a >> b`, `>> nth=0`) counts like a descendant step
+    selector = re.sub(r"\s*>>\s*", " ", selector.strip())
+    parts, current, depth, quote = [], "", 0, None
+    escaped = False
+    for char in selector:
+        if escaped:
+            current += char
+            escaped = False
+        elif char == "\\":
+            current += char
+            escaped = True
+        elif quote:
+            current += char
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+            current += char
+        elif char in "[(":
+            depth += 1
+            current += char
+        elif char in "])":
+            depth -= 1
+            current += char
+        elif depth == 0 and (char.isspace() or char in ">+~"):
+            if current:
+                parts.append(current)
+                current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _compound_anchor(compound: str) -> str:
+    """The most stable kind of anchor a single compound selector offers"""
+    if compound.startswith(("xpath=", "//", "..")):
+        return "xpath"
+    role = ROLE_ENGINE_RE.match(compound)
+    if role:
+        return "role_name" if "name=" in role.group(2) else "role"
+    if compound.startswith(("internal:label=", "label=")):
+        return "label"
+    if compound.startswith("internal:testid=") or compound.startswith("data-testid="):
+        return "test_id"
+
+    kinds = []
+    for name, value in ATTR_RE.findall(compound):
+        value = value.strip("\"'")
+        if name in TEST_ID_ATTRS:
+            kinds.append("test_id" if value and not is_generated_name(value) else "attribute")
+        elif name == "aria-label":
+            kinds.append("aria_label")
+        elif name == "name":
+            kinds.append("name")
+        elif name == "placeholder":
+            kinds.append("placeholder")
+        elif name == "id":
+            kinds.append("generated" if is_generated_name(value) else "id")
+        elif name == "role":
+            kinds.append("role")
+        elif name == "class":
+            kinds.append("generated" if is_generated_name(value) else "class")
+        else:
+            kinds.append("attribute")
+    stripped = ATTR_RE.sub("", compound)
+    for name in ID_RE.findall(stripped):
+        kinds.append("generated" if is_generated_name(name) else "id")
+    for name in CLASS_RE.findall(stripped):
+        kinds.append("generated" if is_generated_name(name) else "class")
+    if TEXT_RE.search(compound):
+        kinds.append("text")
+    if not kinds:
+        kinds.append("tag" if re.match(r"^[a-zA-Z][\w-]*", compound) else "generated")
+    return max(kinds, key=lambda kind: ANCHOR_SCORES[kind])
+
+
+def score_selector(selector: str) -> float:
+    """Predicted stability of a selector from 0 (brittle) to 1 (durable).
+
+    Every compound must keep matching for the selector to work, so the
+    weakest compound decides the score; positional steps cap it.
+    """
+    # Frame qualifiers are part of the page structure, only the element part counts
+    element = split_frame_selector(selector)[-1]
+    compounds = split_compounds(element)
+    if not compounds:
+        return 0.0
+    score = min(ANCHOR_SCORES[_compound_anchor(compound)] for compound in compounds)
+    score -= COMBINATOR_PENALTY * (len(compounds) - 1)
+    if any(POSITIONAL_RE.search(compound) for compound in compounds):
+        score = min(score, POSITIONAL_CAP)
+    return round(max(score, 0.0), 3)
+
+
+def rank_by_stability(selectors: List[str]) -> List[str]:
+    """Selectors ordered from most to least stable, keeping the given order on ties"""
+    return sorted(selectors, key=score_selector, reverse=True)
+
+
+# Proposes selectors for one element, from every anchor it offers, and checks
+# which plain CSS candidates are unique across the document and open shadow
+# roots. Playwright-only candidates (role=, :has-text) come back unchecked.
+CANDIDATES_SCRIPT = """
+(el, testIdAttrs) => {
+    const quote = (value) => '"' + String(value).replace(/\\\\/g, '\\\\\\\\').replace(/"/g, '\\\\"') + '"';
+    const clean = (text) => (text || '').trim().replace(/\\s+/g, ' ');
+    const tag = el.tagName.toLowerCase();
+    const candidates = [];
+    const add = (selector, css = true) => {
+        if (!candidates.some((c) => c.selector === selector)) candidates.push({selector, css});
+    };
+
+    const roots = [document];
+    for (let i = 0; i < roots.length; i++) {
+        roots[i].querySelectorAll('*').forEach((node) => {
+            if (node.shadowRoot) roots.push(node.shadowRoot);
+        });
+    }
+    const uniqueFor = (selector) => {
+        const matches = [];
+        try {
+            for (const root of roots) matches.push(...root.querySelectorAll(selector));
+        } catch (e) {
+            return false;
+        }
+        return matches.length === 1 && matches[0] === el;
+    };
+
+    const implicitRole = () => {
+        const explicit = el.getAttribute('role');
+        if (explicit) return explicit.split(' ')[0];
+        const type = (el.getAttribute('type') || 'text').toLowerCase();
+        if (tag === 'button') return 'button';
+        if (tag === 'a' && el.hasAttribute('href')) return 'link';
+        if (tag === 'textarea') return 'textbox';
+        if (tag === 'select') return el.multiple ? 'listbox' : 'combobox';
+        if (/^h[1-6]$/.test(tag)) return 'heading';
+        if (tag === 'img' && el.getAttribute('alt')) return 'img';
+        if (tag === 'input') {
+            if (['button', 'submit', 'reset', 'image'].includes(type)) return 'button';
+            if (['checkbox', 'radio'].includes(type)) return type;
+            if (type === 'number') return 'spinbutton';
+            if (['text', 'email', 'tel', 'url', 'search'].includes(type)) return 'textbox';
+        }
+        return null;
+    };
+    const labelText = () => {
+        if (el.labels && el.labels.length) return clean(el.labels[0].textContent);
+        const ids = el.getAttribute('aria-labelledby');
+        if (ids) {
+            return clean(ids.split(/\\s+/).map((id) => {
+                const node = el.ownerDocument.getElementById(id);
+                return node ? node.textContent : '';
+            }).join(' '));
+        }
+        return '';
+    };
+    const accessibleName = () => {
+        const label = el.getAttribute('aria-label');
+        if (label) return clean(label);
+        const labelled = labelText();
+        if (labelled) return labelled;
+        if (tag === 'input' && ['button', 'submit', 'reset'].includes(el.type)) return clean(el.value);
+        if (tag === 'img') return clean(el.getAttribute('alt'));
+        if (['button', 'a', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'].includes(tag) ||
+            ['button', 'link', 'tab', 'menuitem', 'option'].includes(el.getAttribute('role'))) {
+            return clean(el.textContent);
+        }
+        return clean(el.getAttribute('title'));
+    };
+
+    for (const attr of testIdAttrs) {
+        const value = el.getAttribute(attr);
+        if (value) add(`[${attr}=${quote(value)}]`);
+    }
+    const role = implicitRole();
+    const name = accessibleName();
+    if (role && name && name.length <= 60) add(`role=${role}[name=${quote(name)}]`, false);
+    const ariaLabel = el.getAttribute('aria-label');
+    if (ariaLabel) add(`${tag}[aria-label=${quote(ariaLabel)}]`);
+    if (el.id) add(`#${CSS.escape(el.id)}`);
+    const nameAttr = el.getAttribute('name');
+    if (nameAttr) add(`${tag}[name=${quote(nameAttr)}]`);
+    const placeholder = el.getAttribute('placeholder');
+    if (placeholder) add(`${tag}[placeholder=${quote(placeholder)}]`);
+    const text = clean(el.textContent);
+    if (['button', 'a', 'label', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'].includes(tag) &&
+        text && text.length <= 40) {
+        add(`${tag}:has-text(${quote(text)})`, false);
+    }
+    for (const attr of ['type', 'href', 'title', 'alt', 'for']) {
+        const value = el.getAttribute(attr);
+        if (value && value.length <= 80) add(`${tag}[${attr}=${quote(value)}]`);
+    }
+    for (const cls of el.classList) add(`${tag}.${CSS.escape(cls)}`);
+
+    // Scope by the nearest ancestor that has a stable anchor of its own
+    for (let node = el.parentElement; node; node = node.parentElement) {
+        const testId = testIdAttrs.map((attr) => [attr, node.getAttribute(attr)]).find(([, v]) => v);
+        const scope = testId ? `[${testId[0]}=${quote(testId[1])}]` : (node.id ? `#${CSS.escape(node.id)}` : null);
+        if (!scope) continue;
+        const type = el.getAttribute('type');
+        if (type) add(`${scope} ${tag}[type=${quote(type)}]`);
+        add(`${scope} ${tag}`);
+        break;
+    }
+
+    // Positional path as a last resort, always unique
+    const steps = [];
+    for (let node = el; node && node.parentElement; node = node.parentElement) {
+        const siblings = Array.from(node.parentElement.children).filter((s) => s.tagName === node.tagName);
+        const step = node.tagName.toLowerCase();
+        steps.unshift(siblings.length > 1 ? `${step}:nth-of-type(${siblings.indexOf(node) + 1})` : step);
+    }
+    add(steps.join(' > '));
+
+    return candidates.map((c) => ({selector: c.selector, unique: c.css ? uniqueFor(c.selector) : null}));
+}
+"""
+
+
+def stable_selector(page: Page, selector: str, min_gain: float = 0.0) -> Optional[str]:
+    """The most stable selector that uniquely matches the element `selector` matches.
+
+    Returns None when `selector` does not match exactly one element, or when
+    no candidate scores more than `min_gain` above `selector` itself.
+    """
+    parts = split_frame_selector(selector)
+    prefix = "".join(part + FRAME_DELIMITER for part in parts[:-1])
+    target = resolve_locator(page, selector)
+    if target.count() != 1:
+        return None
+    handle = target.element_handle()
+    candidates = handle.evaluate(CANDIDATES_SCRIPT, list(TEST_ID_ATTRS))
+
+    baseline = score_selector(selector)
+    scored = sorted(((score_selector(c["selector"]), index, c) for index, c in enumerate(candidates)),
+                    key=lambda item: (-item[0], item[1]))
+    for score, _, candidate in scored:
+        if score <= baseline + min_gain:
+            break
+        if candidate["unique"] is False:
+            continue
+        qualified = prefix + candidate["selector"]
+        if candidate["unique"] is None and not _matches_only(page, qualified, handle):
+            continue
+        return qualified
+    return None
+
+
+def _matches_only(page: Page, selector: str, handle) -> bool:
+    """Whether a Playwright selector matches exactly the given element"""
+    try:
+        found = resolve_locator(page, selector)
+        return found.count() == 1 and found.evaluate("(el, target) => el === target", handle)
+    except Exception:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the stability of a test's selectors")
+    parser.add_argument("test_file", help="test case JSON file")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="flag steps whose best selector scores below this")
+    args = parser.parse_args()
+
+    with open(args.test_file, "r") as f:
+        test_data = json.load(f)
+    brittle = 0
+    for index, step in enumerate(test_data.get("steps", []), 1):
+        selectors = rank_by_stability(step.get("selectors", []))
+        best = score_selector(selectors[0]) if selectors else 0.0
+        brittle += best < args.threshold
+        mark = "⚠️ " if best < args.threshold else "✅"
+        print(f"{mark} Step {index}: {step.get('description', '')}")
+        for selector in selectors:
+            print(f"     {score_selector(selector):.2f}  {selector}")
+    print(f"{brittle} of {len(test_data.get('steps', []))} steps rely on brittle selectors")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,44 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+import asyncio
+import hashlib
 import json
+import os
 import uuid
-from test_runner import PlaywrightTestRunner
+from test_runner import PlaywrightTestRunner, TestCancelled
 from selector_healer import SelectorHealer
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from job_scheduler import JobScheduler, QueueFull, PRIORITIES
+from job_store import JobStore, MemoryJobStore, SQLiteJobStore, FINISHED_STATUSES
+from job_events import JobEvents, TERMINAL_EVENTS
+from browser_pool import BrowserPool
+from job_broker import SQLiteBroker
+from model_warmer import ModelWarmer
+import metrics
+import threading
+import time
 
 app = FastAPI(title="Playwright Selector Healer Service")
 
-# In-memory job storage (use Redis/DB for production)
-jobs = {}
+def create_job_store() -> JobStore:
+    """Build the job store selected by HEALER_JOB_STORE (sqlite or memory)"""
+    ttl = float(os.environ.get("HEALER_JOB_TTL", "3600"))
+    max_jobs = int(os.environ.get("HEALER_MAX_JOBS", "1000"))
+    if os.environ.get("HEALER_JOB_STORE", "sqlite") == "memory":
+        return MemoryJobStore(ttl=ttl, max_jobs=max_jobs)
+    return SQLiteJobStore(os.environ.get("HEALER_JOB_DB", "healer_jobs.db"),
+                          ttl=ttl, max_jobs=max_jobs)
+
+jobs = create_job_store()
+events = JobEvents()
+browser_pool = BrowserPool(headless=True)
+# One healer per worker thread, reused across heal jobs like the thread's browser
+worker_healers = threading.local()
+
+JOB_SECONDS = metrics.Histogram("healer_job_duration_seconds", "Test job run time", ("outcome",))
+HTTP_SECONDS = metrics.Histogram("healer_http_request_seconds", "HTTP request latency",
+                                 ("method", "route", "status"))
 
 class TestStep(BaseModel):
     description: str
@@ -19,11 +46,37 @@ class TestStep(BaseModel):
     text: Optional[str] = None
     expected_text: Optional[str] = None
     selectors: List[str]
+    # Seconds Playwright may wait on this step, overriding TestCase.step_timeout
+    timeout: Optional[float] = None
 
 class TestCase(BaseModel):
     name: str
     url: str
     steps: List[TestStep]
+    # Deadline for the whole run in seconds; the job fails once it passes
+    timeout: Optional[float] = None
+    step_timeout: Optional[float] = None
+    # Predict and batch-heal broken selectors before running, against the
+    # selector snapshot ("baseline") returned with the last passing run
+    preflight: bool = False
+    baseline: Optional[Dict[str, Dict]] = None
+
+class HealItem(BaseModel):
+    failed_selector: str
+    description: str
+    alternatives: Optional[List[str]] = None
+    action: Optional[str] = None
+    expected_text: Optional[str] = None
+
+class HealRequest(HealItem):
+    url: str
+    timeout: float = 60
+
+class BatchHealRequest(BaseModel):
+    url: str
+    setup_steps: List[TestStep] = []
+    items: List[HealItem]
+    timeout: float = 120
 
 class JobResponse(BaseModel):
     job_id: str
@@ -36,55 +89,286 @@ class JobStatus(BaseModel):
     result: Optional[Dict] = None
     error: Optional[str] = None
 
-executor = ThreadPoolExecutor(max_workers=4)
+def content_hash(test_data: dict) -> str:
+    """Hash of the canonical test content, URL included"""
+    canonical = json.dumps(test_data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def set_job_status(job_id: str, status: str, result: Optional[Dict] = None,
+                   error: Optional[str] = None):
+    """Store a job's new status, then announce it to event subscribers"""
+    jobs.update(job_id, status, result=result, error=error)
+    events.publish(job_id, status, {"error": error} if error else None)
 
-def run_test_sync(test_data: dict, job_id: str):
-    """Run test synchronously in thread"""
+# Cancellation flags of jobs on the local scheduler, set by DELETE /job/{id}
+cancel_events: Dict[str, threading.Event] = {}
+
+def run_test_sync(job_id: str, test_data: dict):
+    """Run test synchronously in a scheduler worker thread"""
+    cancelled = cancel_events.setdefault(job_id, threading.Event())
+    if cancelled.is_set():
+        # Cancelled while queued; DELETE already recorded the status
+        cancel_events.pop(job_id, None)
+        return
+    set_job_status(job_id, "running")
+    started = time.monotonic()
+    outcome_label = "failed"
     try:
-        # Create temp file
-        temp_file = f"/tmp/test_{job_id}.json"
-        with open(temp_file, 'w') as f:
-            json.dump(test_data, f)
-        
-        runner = PlaywrightTestRunner(temp_file)
-        runner.run_test()
+        runner = PlaywrightTestRunner(
+            test_data,
+            on_event=lambda event_type, data: events.publish(job_id, event_type, data),
+            pause=0,
+            browser_pool=browser_pool,
+            cancelled=cancelled
+        )
+        outcome = runner.run_test()
+        events.publish(job_id, "report", outcome["report"])
         
-        # Load updated data
-        with open(temp_file, 'r') as f:
-            updated_data = json.load(f)
-        
-        jobs[job_id] = {
-            "status": "completed",
-            "result": updated_data
-        }
+        set_job_status(job_id, "completed", result=outcome["test"])
+        outcome_label = "passed" if outcome["report"]["passed"] else "test_failed"
+    except TestCancelled as e:
+        set_job_status(job_id, "cancelled", error=str(e))
+        outcome_label = "cancelled"
     except Exception as e:
-        jobs[job_id] = {
-            "status": "failed",
-            "error": str(e)
-        }
-
-@app.post("/test/run", response_model=JobResponse)
-async def run_test(test_case: TestCase, background_tasks: BackgroundTasks):
-    """Execute test case with selector healing"""
-    job_id = str(uuid.uuid4())
-    jobs[job_id] = {"status": "running"}
+        set_job_status(job_id, "failed", error=str(e))
+    finally:
+        cancel_events.pop(job_id, None)
+        JOB_SECONDS.observe(time.monotonic() - started, outcome=outcome_label)
+
+def thread_healer() -> SelectorHealer:
+    """This worker thread's healer, created on first use"""
+    healer = getattr(worker_healers, "healer", None)
+    if healer is None:
+        healer = worker_healers.healer = SelectorHealer()
+    return healer
+
+def heal_single_sync(request: dict, cancelled: threading.Event) -> dict:
+    """Heal one selector on this worker's pooled browser and healer"""
+    with browser_pool.page() as page:
+        page.goto(request["url"], timeout=request["timeout"] * 1000)
+        if cancelled.is_set():
+            return {"healed_selector": None}
+        healed = thread_healer().heal_selector(
+            page, request["failed_selector"], request["description"],
+            request["alternatives"], step=request, timeout=request["timeout"],
+            should_stop=cancelled.is_set
+        )
+    return {"healed_selector": healed}
+
+def heal_batch_sync(request: dict, cancelled: threading.Event) -> dict:
+    """Load the page once on this worker's pooled browser and heal every item"""
+    started = time.monotonic()
+    # The request timeout bounds setup and healing together
+    runner = PlaywrightTestRunner(
+        {"name": "batch heal setup", "url": request["url"], "steps": request["setup_steps"],
+         "timeout": request["timeout"]},
+        pause=0,
+        browser_pool=browser_pool,
+        cancelled=cancelled
+    )
+    runner.healer = thread_healer()
+    with browser_pool.page() as page:
+        if not runner.run_on_page(page):
+            raise RuntimeError(f"Setup step {len(runner.step_results)} failed")
+        setup_seconds = time.monotonic() - started
+        if cancelled.is_set():
+            return {"results": [], "setup_seconds": round(setup_seconds, 3),
+                    "seconds": round(time.monotonic() - started, 3)}
+        remaining = max(0.0, started + request["timeout"] - time.monotonic())
+        results = runner.healer.heal_batch(page, request["items"], timeout=remaining,
+                                           should_stop=cancelled.is_set)
+    
+    return {
+        "results": results,
+        "setup_seconds": round(setup_seconds, 3),
+        "seconds": round(time.monotonic() - started, 3)
+    }
+
+# Each worker owns one pooled browser, so HEALER_WORKERS caps concurrent Chromium instances
+scheduler = JobScheduler(
+    run_test_sync,
+    workers=int(os.environ.get("HEALER_WORKERS", "4")),
+    max_queue=int(os.environ.get("HEALER_MAX_QUEUE", "100")),
+    worker_teardown=browser_pool.close_current
+)
+
+# In frontend mode test jobs go to a shared broker and run on healer_worker.py
+# processes; the local scheduler then only serves /heal requests.
+broker = None
+if os.environ.get("HEALER_MODE", "standalone") == "frontend":
+    broker = SQLiteBroker(os.environ.get("HEALER_BROKER_DB", "healer_broker.db"))
+relay_stop = threading.Event()
+
+def dispatch_job(job_id: str, test_data: dict, priority: str):
+    """Hand a job to the local worker pool, or to the broker in frontend mode"""
+    if broker is None:
+        cancel_events[job_id] = threading.Event()
+        try:
+            scheduler.submit(job_id, test_data, priority)
+        except QueueFull:
+            cancel_events.pop(job_id, None)
+            raise
+        return
+    if broker.depth() >= scheduler.max_queue:
+        raise QueueFull(scheduler.retry_after())
+    broker.enqueue(job_id, test_data, priority)
+
+def drain_broker_events(cursor: int = 0) -> int:
+    """Copy every waiting broker event into the job store and event stream; returns the last cursor"""
+    while True:
+        batch = broker.events_since(cursor)
+        if not batch:
+            return cursor
+        for cursor, job_id, event_type, data in batch:
+            if event_type in ("running",) + TERMINAL_EVENTS:
+                set_job_status(job_id, event_type, result=data.get("result"),
+                               error=data.get("error"))
+            else:
+                events.publish(job_id, event_type, data)
+        broker.ack(cursor)
+
+def relay_broker_events():
+    """Copy remote workers' progress and results into the job store and event stream"""
+    cursor = 0
+    while not relay_stop.is_set():
+        try:
+            cursor = drain_broker_events(cursor)
+        except Exception as e:
+            print(f"Broker relay error: {e}")
+        relay_stop.wait(0.25)
+
+# Models loaded at startup and kept resident while heal traffic lasts;
+# HEALER_WARM_MODELS="" turns warming off
+model_warmer = ModelWarmer(
+    os.environ.get("OLLAMA_URL", "http://localhost:11434"),
+    [name.strip() for name in os.environ.get(
+        "HEALER_WARM_MODELS", os.environ.get("OLLAMA_MODEL", "llama3.2")).split(",") if name.strip()],
+    min_keep_alive=float(os.environ.get("HEALER_KEEP_ALIVE_MIN", "300")),
+    max_keep_alive=float(os.environ.get("HEALER_KEEP_ALIVE_MAX", "3600")),
+    interval=float(os.environ.get("HEALER_WARM_INTERVAL", "60"))
+)
+
+metrics.Gauge("healer_queue_depth", "Queued jobs by priority",
+              lambda: {(name,): n for name, n in scheduler.stats()["queued_by_priority"].items()},
+              ("priority",))
+metrics.Gauge("healer_jobs_running", "Jobs currently on a worker",
+              lambda: scheduler.stats()["running"])
+metrics.Gauge("healer_workers", "Worker threads", lambda: scheduler.workers)
+metrics.Gauge("healer_broker_depth", "Jobs waiting in the shared broker",
+              lambda: broker.depth() if broker else 0)
+metrics.Gauge("healer_browsers", "Launched pooled browsers", lambda: browser_pool.stats()["browsers"])
+metrics.Gauge("healer_browsers_in_use", "Pooled browsers with a job's page open",
+              lambda: browser_pool.stats()["in_use"])
+metrics.Gauge("healer_model_resident", "Whether Ollama holds a warmed model in memory",
+              lambda: {(model,): 1 if state["resident"] else 0
+                       for model, state in model_warmer.cached_residency().items()},
+              ("model",))
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.monotonic()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(time.monotonic() - started, method=request.method,
+                         route=route.path if route else "unmatched",
+                         status=response.status_code)
+    return response
+
+@app.on_event("startup")
+def start_scheduler():
+    scheduler.start()
+    model_warmer.start()
+    if broker:
+        # Results workers finished while the service was down must reach the job
+        # store first, or those jobs would look pending and run again
+        drain_broker_events()
+        threading.Thread(target=relay_broker_events, name="broker-relay", daemon=True).start()
+    # Resume jobs that were queued or running when the service last stopped;
+    # the broker ignores jobs it still holds
+    for job_id, test_data, priority in jobs.pending():
+        try:
+            dispatch_job(job_id, test_data, priority)
+        except QueueFull:
+            set_job_status(job_id, "failed", error="Job queue was full when resuming after restart")
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    relay_stop.set()
+    model_warmer.stop()
+    scheduler.stop()
+
+@app.post("/test/run", response_model=JobResponse, status_code=202)
+async def run_test(test_case: TestCase, priority: str = "normal", dedupe: bool = False,
+                   max_age: float = 0):
+    """Queue test case for execution with selector healing.
+
+    With `dedupe`, an identical test (same steps and URL) that is still queued or
+    running is reused instead of starting a new browser run, as is one that
+    completed within the last `max_age` seconds.
+    """
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=422, detail=f"priority must be one of {list(PRIORITIES)}")
     
     test_data = test_case.dict()
-    background_tasks.add_task(run_test_sync, test_data, job_id)
+    digest = content_hash(test_data)
+    if dedupe:
+        existing = jobs.find_by_hash(digest, max_age)
+        if existing:
+            reused = "recent result" if existing["status"] == "completed" else "running job"
+            return JobResponse(
+                job_id=existing["job_id"],
+                status=existing["status"],
+                message=f"Identical test submitted recently, reusing {reused}"
+            )
+    
+    job_id = str(uuid.uuid4())
+    jobs.create(job_id, test_data, priority, content_hash=digest)
+    
+    try:
+        dispatch_job(job_id, test_data, priority)
+    except QueueFull as e:
+        jobs.delete(job_id)
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    model_warmer.record_request()
     
     return JobResponse(
         job_id=job_id,
-        status="running",
-        message="Test execution started"
+        status="queued",
+        message="Test execution queued"
     )
 
+@app.get("/queue")
+async def queue_stats():
+    """Job queue depth and worker utilization"""
+    stats = scheduler.stats()
+    if broker:
+        stats["broker_queued"] = broker.depth()
+    return stats
+
 @app.get("/job/{job_id}", response_model=JobStatus)
-async def get_job_status(job_id: str):
-    """Get job execution status"""
-    if job_id not in jobs:
+async def get_job_status(job_id: str, wait: float = 0):
+    """Get job execution status, optionally long-polling up to `wait` seconds for completion"""
+    job_data = jobs.get(job_id)
+    if job_data is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job_data = jobs[job_id]
+    if wait > 0 and job_data["status"] not in FINISHED_STATUSES:
+        queue = events.subscribe(job_id)
+        try:
+            # Re-read after subscribing so a job finishing in between is not missed
+            job_data = jobs.get(job_id)
+            deadline = asyncio.get_running_loop().time() + min(wait, 60)
+            while job_data["status"] not in FINISHED_STATUSES:
+                remaining = deadline - asyncio.get_running_loop().time()
+                event = await asyncio.wait_for(queue.get(), timeout=remaining)
+                if event["type"] in TERMINAL_EVENTS:
+                    job_data = jobs.get(job_id)
+        except asyncio.TimeoutError:
+            job_data = jobs.get(job_id)
+        finally:
+            events.unsubscribe(job_id, queue)
+    
     return JobStatus(
         job_id=job_id,
         status=job_data["status"],
@@ -92,38 +376,125 @@ async def get_job_status(job_id: str):
         error=job_data.get("error")
     )
 
+@app.delete("/job/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a job; a queued job never starts, a running one stops at its next step"""
+    job_data = jobs.get(job_id)
+    if job_data is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job_data["status"] in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job_data['status']}")
+
+    if broker is not None:
+        was_queued = broker.cancel(job_id) == "queued"
+    else:
+        flag = cancel_events.get(job_id)
+        if flag is not None:
+            flag.set()
+        was_queued = job_data["status"] == "queued"
+
+    if was_queued:
+        set_job_status(job_id, "cancelled", error="Job was cancelled")
+        return JobResponse(job_id=job_id, status="cancelled", message="Queued job cancelled")
+    return JobResponse(job_id=job_id, status="cancelling",
+                       message="Job will stop at its next step boundary")
+
+def format_sse(event: Dict) -> str:
+    """Encode an event in text/event-stream format"""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+@app.get("/job/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events with per-step progress, heal events and completion"""
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def stream():
+        queue = events.subscribe(job_id)
+        try:
+            job_data = jobs.get(job_id)
+            if job_data and job_data["status"] in FINISHED_STATUSES:
+                yield format_sse({"type": job_data["status"], "job_id": job_id,
+                                  "error": job_data.get("error")})
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            events.unsubscribe(job_id, queue)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+async def wait_for_disconnect(request: Request):
+    """Return once the HTTP client has gone away"""
+    while not await request.is_disconnected():
+        await asyncio.sleep(0.5)
+
+async def run_on_worker(request: Request, fn, payload: dict, timeout: float):
+    """Run blocking Playwright work on a scheduler worker without blocking the event loop.
+
+    Gives up after `timeout` seconds or when the client disconnects; the
+    worker is told to stop at its next checkpoint.
+    """
+    cancelled = threading.Event()
+    try:
+        future = scheduler.run(fn, payload, cancelled, priority="high")
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    
+    result = asyncio.wrap_future(future)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({result, disconnected}, timeout=timeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+    
+    if result in done:
+        try:
+            return result.result()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    cancelled.set()
+    future.cancel()
+    if disconnected in done:
+        # Nobody is listening; the status code is only for the access log
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    raise HTTPException(status_code=504, detail=f"Healing did not finish within {timeout}s")
+
 @app.post("/heal")
-async def heal_selector(
-    url: str,
-    failed_selector: str,
-    description: str,
-    alternatives: Optional[List[str]] = None
-):
+async def heal_selector(request: HealRequest, http_request: Request):
     """Heal a single selector without running full test"""
-    try:
-        from playwright.sync_api import sync_playwright
-        
-        healer = SelectorHealer()
-        
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.goto(url)
-            
-            healed = healer.heal_selector(
-                page, failed_selector, description, alternatives
-            )
-            
-            browser.close()
-            
-        return {"healed_selector": healed}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    model_warmer.record_request()
+    return await run_on_worker(http_request, heal_single_sync, request.dict(),
+                               request.timeout)
+
+@app.post("/heal/batch")
+async def heal_batch(request: BatchHealRequest, http_request: Request):
+    """Heal many selectors of one page with a single page load on a pooled browser"""
+    model_warmer.record_request()
+    return await run_on_worker(http_request, heal_batch_sync, request.dict(),
+                               request.timeout)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text-format metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 async def health_check():
-    """Service health check"""
-    return {"status": "healthy"}
+    """Service health check, with whether each warmed model was loaded in Ollama at the last check"""
+    models = model_warmer.status()
+    return {"status": "healthy", "models": models}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Run a suite of tests, healing each distinct breakage once.
+
+A shared component change breaks the same selector in many tests. The suite
+first runs every test without healing, then clusters the failed steps by
+selector pattern and by the DOM outline of the region around the failure.
+One representative per cluster is healed; its fix is translated to the other
+members and validated by rerunning them, and only members the fix does not
+work for are healed on their own:
+
+    python suite_runner.py tests/*.json --json suite_report.json
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional, Union
+from playwright.sync_api import Page, sync_playwright
+from dom_discovery import FRAME_DELIMITER, resolve_locator, split_frame_selector
+from metrics import HEALS
+from selector_healer import SelectorHealer
+from selector_stability import split_compounds
+from test_runner import PlaywrightTestRunner
+
+# Outlines an element's subtree, open shadow roots included, as tag#id.class
+# tokens; similar outlines mean the failure sits in the same component.
+OUTLINE_SCRIPT = """
+(elements, limit) => {
+    const el = elements[0];
+    if (!el) return null;
+    const tokens = [];
+    const walk = (node) => {
+        if (tokens.length >= limit) return;
+        let token = node.tagName.toLowerCase();
+        if (node.id) token += '#' + node.id;
+        for (const cls of Array.from(node.classList).sort()) token += '.' + cls;
+        tokens.push(token);
+        if (node.shadowRoot) Array.from(node.shadowRoot.children).forEach(walk);
+        Array.from(node.children).forEach(walk);
+    };
+    walk(el);
+    return tokens;
+}
+"""
+OUTLINE_LIMIT = 200
+
+
+def _frame_prefix(selector: str) -> str:
+    return "".join(part + FRAME_DELIMITER for part in split_frame_selector(selector)[:-1])
+
+
+def selector_pattern(selector: str) -> str:
+    """The selector with its last compound wildcarded, e.g. '#header *' for '#header .login'"""
+    compounds = split_compounds(split_frame_selector(selector)[-1])
+    if len(compounds) < 2:
+        return selector
+    return _frame_prefix(selector) + " ".join(compounds[:-1]) + " *"
+
+
+def failed_region(page: Page, selector: str) -> List[str]:
+    """Outline of the deepest ancestor scope of a failed selector that still matches"""
+    prefix = _frame_prefix(selector)
+    compounds = split_compounds(split_frame_selector(selector)[-1])
+    for length in range(len(compounds) - 1, 0, -1):
+        try:
+            tokens = resolve_locator(page, prefix + " ".join(compounds[:length])).evaluate_all(
+                OUTLINE_SCRIPT, OUTLINE_LIMIT)
+        except Exception:
+            continue
+        if tokens:
+            return tokens
+    return []
+
+
+def similarity(a: List[str], b: List[str]) -> float:
+    """Jaccard similarity of two region outlines; two unresolvable regions count as equal"""
+    if not a and not b:
+        return 1.0
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b)
+
+
+def cluster_failures(failures: List[Dict], threshold: float = 0.6) -> List[Dict]:
+    """Group failures with the same selector pattern and similar failed regions.
+
+    The first failure of each cluster is its representative.
+    """
+    clusters = []
+    for failure in failures:
+        for cluster in clusters:
+            representative = cluster["members"][0]
+            if representative["pattern"] == failure["pattern"] and \
+                    similarity(representative["region"], failure["region"]) >= threshold:
+                cluster["members"].append(failure)
+                break
+        else:
+            clusters.append({"pattern": failure["pattern"], "members": [failure]})
+    return clusters
+
+
+def translate_fix(failed: str, healed: str, member_failed: str) -> Optional[str]:
+    """Carry a representative's fix over to another member of its cluster.
+
+    Identical selectors get the same fix. Selectors that differ only in their
+    last compound get the healed scope in front of their own last compound,
+    when the heal only replaced the scope.
+    """
+    if member_failed == failed:
+        return healed
+    if _frame_prefix(member_failed) != _frame_prefix(failed):
+        return None
+    failed_compounds = split_compounds(split_frame_selector(failed)[-1])
+    member_compounds = split_compounds(split_frame_selector(member_failed)[-1])
+    healed_element = split_frame_selector(healed)[-1]
+    last = failed_compounds[-1]
+    if len(failed_compounds) < 2 or failed_compounds[:-1] != member_compounds[:-1] or \
+            not healed_element.endswith(last) or healed_element == last:
+        return None
+    return _frame_prefix(healed) + healed_element[:-len(last)] + member_compounds[-1]
+
+
+class SuiteRunner:
+    """Runs many tests in one browser, healing each cluster of failures once"""
+
+    def __init__(self, tests: List[Union[str, Dict]], headless: bool = True,
+                 threshold: float = 0.6):
+        """`tests` are JSON file paths or in-memory test cases, as for PlaywrightTestRunner"""
+        self.tests = list(tests)
+        self.headless = headless
+        # Minimum region similarity for two failures to share a root cause
+        self.threshold = threshold
+        self.healer = SelectorHealer()
+        self.heal_calls = 0
+        self.browser = None
+
+    def _name(self, index: int) -> str:
+        test = self.tests[index]
+        return test if isinstance(test, str) else test.get("name", f"test {index + 1}")
+
+    def _run(self, index: int, heal: bool, hint: Optional[Dict] = None) -> Dict:
+        """Run one test in a fresh context, optionally trying a translated fix first.
+
+        Without healing, a failed run also reports where it failed, with the
+        failed region's outline captured before the page closes.
+        """
+        runner = PlaywrightTestRunner(self.tests[index], headless=self.headless, pause=0,
+                                      heal=heal)
+        runner.healer = self.healer
+        if hint:
+            runner.test_data['steps'][hint["step"]]['selectors'].insert(0, hint["selector"])
+
+        context = self.browser.new_context()
+        page = context.new_page()
+        outcome = {"index": index, "test": self._name(index), "passed": False, "failure": None}
+        try:
+            outcome["passed"] = runner.run_on_page(page)
+            last = runner.step_results[-1] if runner.step_results else None
+            if not outcome["passed"] and not heal and last and last["status"] == "failed":
+                step = runner.test_data['steps'][last["step"]]
+                selector = step['selectors'][0] if step.get('selectors') else ""
+                outcome["failure"] = {
+                    "index": index, "test": outcome["test"], "step": last["step"],
+                    "description": last["description"], "selector": selector,
+                    "pattern": selector_pattern(selector),
+                    "region": failed_region(page, selector) if selector else []
+                }
+        except Exception as e:
+            print(f"Test {outcome['test']} errored: {e}")
+            outcome["error"] = str(e)
+        finally:
+            context.close()
+
+        if heal:
+            # Every healed step and a step still failing after healing cost one heal
+            self.heal_calls += sum(1 for r in runner.step_results if r["status"] in ("healed", "failed"))
+        if hint:
+            result = next((r for r in runner.step_results if r["step"] == hint["step"]), None)
+            outcome["hint_worked"] = bool(result and result["selector"] == hint["selector"])
+            HEALS.inc(tier="cluster", outcome="success" if outcome["hint_worked"] else "failed")
+            if not outcome["hint_worked"]:
+                runner.test_data['steps'][hint["step"]]['selectors'].remove(hint["selector"])
+            if runner.sink:
+                runner.sink.save(runner.test_data)
+        outcome["steps"] = runner.step_results
+        if not isinstance(self.tests[index], str):
+            # In-memory tests keep their healed selectors for later runs
+            self.tests[index] = runner.test_data
+        return outcome
+
+    def _healed_selector(self, outcome: Dict, step: int) -> Optional[str]:
+        result = next((r for r in outcome["steps"] if r["step"] == step), None)
+        return result["selector"] if result and result["status"] == "healed" else None
+
+    def run(self) -> Dict:
+        """Run the suite and return per-test resolutions and per-cluster results"""
+        started = time.monotonic()
+        resolutions: Dict[int, str] = {}
+        with sync_playwright() as p:
+            self.browser = p.chromium.launch(headless=self.headless)
+            try:
+                failures = []
+                for index in range(len(self.tests)):
+                    outcome = self._run(index, heal=False)
+                    if outcome["passed"]:
+                        resolutions[index] = "passed"
+                    elif outcome["failure"]:
+                        failures.append(outcome["failure"])
+                    else:
+                        resolutions[index] = "error"
+
+                clusters = cluster_failures(failures, self.threshold)
+                print(f"🧩 {len(failures)} failing steps in {len(clusters)} clusters")
+                for cluster in clusters:
+                    self._heal_cluster(cluster, resolutions)
+            finally:
+                self.browser.close()
+                self.browser = None
+
+        return {
+            "tests": [{"test": self._name(i), "resolution": resolutions[i]}
+                      for i in range(len(self.tests))],
+            "clusters": [{
+                "pattern": cluster["pattern"],
+                "members": [{"test": m["test"], "step": m["step"], "selector": m["selector"]}
+                            for m in cluster["members"]],
+                "healed_selector": cluster["healed_selector"],
+                "fix_applied": cluster["fix_applied"],
+                "individual_heals": cluster["individual_heals"]
+            } for cluster in clusters],
+            "failing_steps": len(failures),
+            "heal_calls": self.heal_calls,
+            "duration": round(time.monotonic() - started, 3)
+        }
+
+    def _heal_cluster(self, cluster: Dict, resolutions: Dict[int, str]):
+        """Heal the representative, then validate its fix on every other member"""
+        representative, *members = cluster["members"]
+        outcome = self._run(representative["index"], heal=True)
+        healed = self._healed_selector(outcome, representative["step"])
+        cluster.update(healed_selector=healed, fix_applied=0, individual_heals=0)
+        resolutions[representative["index"]] = "healed" if outcome["passed"] else "failed"
+        print(f"🔧 {representative['test']}: {representative['selector']} -> {healed} "
+              f"({len(members)} more in cluster)")
+
+        for member in members:
+            if healed is None:
+                # Same root cause as an unhealable representative, don't spend heals on it
+                resolutions[member["index"]] = "failed"
+                continue
+            candidate = translate_fix(representative["selector"], healed, member["selector"])
+            hint = {"step": member["step"], "selector": candidate} if candidate else None
+            outcome = self._run(member["index"], heal=True, hint=hint)
+            if outcome.get("hint_worked"):
+                cluster["fix_applied"] += 1
+                resolutions[member["index"]] = "cluster_fix" if outcome["passed"] else "failed"
+            else:
+                cluster["individual_heals"] += 1
+                resolutions[member["index"]] = "healed" if outcome["passed"] else "failed"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run tests as a suite, healing shared breakages once")
+    parser.add_argument("tests", nargs="+", help="test case JSON files")
+    parser.add_argument("--headed", action="store_true", help="show the browser")
+    parser.add_argument("--threshold", type=float, default=0.6,
+                        help="region similarity needed to share a cluster")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = SuiteRunner(args.tests, headless=not args.headed, threshold=args.threshold).run()
+    for test in report["tests"]:
+        mark = {"passed": "✅", "healed": "🔧", "cluster_fix": "🧩", "failed": "❌", "error": "💥"}
+        print(f"{mark[test['resolution']]} {test['test']}: {test['resolution']}")
+    print(f"{report['failing_steps']} failing steps, {len(report['clusters'])} clusters, "
+          f"{report['heal_calls']} heals")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,80 @@
+import copy
 import json
 from playwright.sync_api import sync_playwright, Page
-from selector_healer import SelectorHealer
-from typing import Dict, List
+from selector_healer import AbortSignal, SelectorHealer
+from dom_discovery import resolve_locator, resolve_selectors
+from metrics import HEALS
+from typing import Callable, Dict, List, Optional, Union
+from concurrent.futures import Future
+import threading
 import time
 
+# Playwright's own default, used for steps without a timeout of their own
+DEFAULT_STEP_TIMEOUT = 30.0
+
+
+class TestCancelled(Exception):
+    """The run was cancelled between steps"""
+
+
+class TestDeadlineExceeded(Exception):
+    """The test ran past its `timeout`"""
+
+
+class JsonFileSink:
+    """Persists healed test data back to a JSON file"""
+    def __init__(self, path: str):
+        self.path = path
+
+    def save(self, test_data: Dict):
+        with open(self.path, 'w') as f:
+            json.dump(test_data, f, indent=2)
+
+
 class PlaywrightTestRunner:
-    def __init__(self, test_file_path: str):
-        self.test_file_path = test_file_path
+    def __init__(self, test: Union[str, Dict],
+                 on_event: Optional[Callable[[str, Dict], None]] = None,
+                 sink=None, headless: bool = False, pause: float = 3,
+                 browser_pool=None, cancelled: Optional[threading.Event] = None,
+                 preflight: Optional[bool] = None, heal: bool = True):
+        """`test` is a JSON file path or an in-memory test case.
+
+        Healed test data goes to `sink` (any object with `save(test_data)`);
+        file-based tests default to writing back to their file. With a
+        `browser_pool` the test reuses the calling thread's pooled browser
+        instead of launching its own. Setting `cancelled` stops the run at
+        the next step boundary with TestCancelled. With `preflight` (default:
+        the test's own "preflight" flag) broken selectors are predicted and
+        healed in one batch before any step runs. With `heal` off a step whose
+        selectors all fail simply fails, leaving the page where it broke.
+        """
+        if isinstance(test, str):
+            self.test_file_path = test
+            self.test_data = self._load_test_data()
+            self.sink = sink or JsonFileSink(test)
+        else:
+            self.test_file_path = None
+            self.test_data = copy.deepcopy(test)
+            self.sink = sink
         self.healer = SelectorHealer()
-        self.test_data = self._load_test_data()
+        # Receives progress events such as step_passed, step_healed and step_failed
+        self.on_event = on_event
+        self.headless = headless
+        # Seconds to keep the browser open after the last step, for watching demos
+        self.pause = pause
+        self.browser_pool = browser_pool
+        self.cancelled = cancelled
+        self.deadline: Optional[float] = None
+        # Monotonic deadline of the step being executed, see run_on_page
+        self._step_deadline: Optional[float] = None
+        self.step_results: List[Dict] = []
+        self.heal = heal
+        self.preflight = self.test_data.get('preflight', False) if preflight is None else preflight
+        self.preflight_report: List[Dict] = []
+        # Per step: selectors predicted broken, and the selector healed before execution
+        self._predicted_broken: Dict[int, set] = {}
+        self._preflight_heals: Dict[int, str] = {}
+        self._snapshot: Dict[str, Dict] = {}
         
     def _load_test_data(self) -> Dict:
         """Load test case JSON file"""
@@ -16,101 +82,319 @@ class PlaywrightTestRunner:
             return json.load(f)
     
     def _save_test_data(self):
-        """Save updated test data back to JSON file"""
-        with open(self.test_file_path, 'w') as f:
-            json.dump(self.test_data, f, indent=2)
-    
-    def run_test(self):
-        """Execute the test with selector healing"""
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)
-            page = browser.new_page()
-            
+        """Hand updated test data to the persistence sink"""
+        if self.sink:
+            self.sink.save(self.test_data)
+
+    def _emit(self, event_type: str, **data):
+        """Report progress to the on_event callback, if any"""
+        if self.on_event:
             try:
-                # Navigate to start URL
-                if 'url' in self.test_data:
-                    page.goto(self.test_data['url'])
+                self.on_event(event_type, data)
+            except Exception as e:
+                print(f"Event callback failed: {e}")
+    
+    def run_test(self) -> Dict:
+        """Execute the test with selector healing, returning the updated test and run report"""
+        self.step_results = []
+        started = time.monotonic()
+        if self.browser_pool:
+            with self.browser_pool.page() as page:
+                passed = self.run_on_page(page)
+        else:
+            with sync_playwright() as p:
+                browser = p.chromium.launch(headless=self.headless)
+                page = browser.new_page()
                 
-                # Execute each step
-                for i, step in enumerate(self.test_data.get('steps', [])):
-                    success = self._execute_step(page, step, i)
-                    if not success:
-                        print(f"Test failed at step {i + 1}")
-                        break
-                time.sleep(3)    
+                try:
+                    passed = self.run_on_page(page)
+                    time.sleep(self.pause)
+                finally:
+                    browser.close()
+        
+        return {
+            "test": self.test_data,
+            "report": {
+                "passed": passed,
+                "healed": sum(1 for r in self.step_results if r["status"] == "healed"),
+                "duration": round(time.monotonic() - started, 3),
+                "steps": self.step_results,
+                "preflight": self.preflight_report
+            }
+        }
+
+    def run_on_page(self, page: Page) -> bool:
+        """Navigate to the test URL and execute every step on an open page"""
+        timeout = self.test_data.get('timeout')
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+        # Navigate to start URL
+        if 'url' in self.test_data:
+            self._check_limits(page, self.test_data.get('step_timeout'))
+            page.goto(self.test_data['url'])
+        if self.preflight:
+            self.run_preflight(page)
+        
+        # Execute each step
+        for i, step in enumerate(self.test_data.get('steps', [])):
+            step_timeout = step.get('timeout') or self.test_data.get('step_timeout') or \
+                DEFAULT_STEP_TIMEOUT
+            self._check_limits(page, step_timeout)
+            step_started = time.monotonic()
+            # Selector attempts, healing and the healed retry all share the step's timeout
+            self._step_deadline = step_started + step_timeout
+            try:
+                success = self._execute_step(page, step, i)
             finally:
-                browser.close()
+                self._step_deadline = None
+            self.step_results[-1]["duration"] = round(time.monotonic() - step_started, 3)
+            if not success:
+                print(f"Test failed at step {i + 1}")
+                return False
+        if self.preflight:
+            self._store_baseline()
+        return True
+
+    def run_preflight(self, page: Page) -> List[Dict]:
+        """Predict broken steps on the freshly loaded page and batch-heal them before execution.
+
+        Every step's selectors are resolved in one in-page evaluation and
+        compared with the test's "baseline", the snapshot stored by its last
+        passing preflight run. Without a baseline entry a selector is only
+        judged broken if its step runs before the first click, i.e. surely on
+        this page.
+        """
+        self._check_limits(page, self.test_data.get('step_timeout'))
+        steps = self.test_data.get('steps', [])
+        selectors = list(dict.fromkeys(s for step in steps for s in step.get('selectors', [])))
+        self._snapshot = resolve_selectors(page, selectors)
+        baseline = self.test_data.get('baseline') or {}
+        first_click = next((i for i, step in enumerate(steps) if step.get('action') == 'click'),
+                           len(steps))
+
+        predictions = []
+        for i, step in enumerate(steps):
+            issues = {}
+            for selector in step.get('selectors', []):
+                issue = self._predict(self._snapshot[selector], baseline.get(selector),
+                                      on_start_page=i <= first_click)
+                if issue:
+                    issues[selector] = issue
+            if not issues:
+                continue
+            self._predicted_broken[i] = {s for s, issue in issues.items() if issue != "changed"}
+            predictions.append({
+                "step": i,
+                "description": step.get('description', f"Step {i + 1}"),
+                "selectors": issues,
+                "broken": set(step.get('selectors', [])) == self._predicted_broken[i]
+            })
+
+        broken = [p for p in predictions if p["broken"]]
+        if broken and self.heal:
+            print(f"Preflight predicts {len(broken)} broken steps, healing them now")
+            # Later steps act on menus and modals that earlier steps open, so on
+            # the start page a suggestion is only checked for a unique match:
+            # without an action the healer skips visible/enabled/editable checks
+            items = [dict(steps[p["step"]], description=p["description"], action=None,
+                          failed_selector=steps[p["step"]]['selectors'][0],
+                          alternatives=steps[p["step"]]['selectors'][1:])
+                     for p in broken]
+            results = self.healer.heal_batch(page, items, timeout=self._heal_timeout(),
+                                             should_stop=self._should_stop)
+            self._check_limits(page, self.test_data.get('step_timeout'))
+            for prediction, result in zip(broken, results):
+                healed = result["healed_selector"]
+                prediction["healed_selector"] = healed
+                if healed:
+                    # Kept aside until the step passes with it, see _execute_step
+                    self._preflight_heals[prediction["step"]] = healed
+            if self._preflight_heals:
+                self._snapshot.update(resolve_selectors(page, list(self._preflight_heals.values())))
+
+        self.preflight_report = predictions
+        self._emit("preflight", steps=predictions)
+        return predictions
+
+    @staticmethod
+    def _predict(current: Dict, previous: Optional[Dict], on_start_page: bool) -> Optional[str]:
+        """broken, ambiguous or changed when a selector's matches differ from its baseline"""
+        if previous is None:
+            return "broken" if on_start_page and current["count"] == 0 else None
+        if previous["count"] >= 1 and current["count"] == 0:
+            return "broken"
+        if previous["count"] == 1 and current["count"] > 1:
+            return "ambiguous"
+        signature = ("tag", "id", "text")
+        if previous["count"] == 1 and current["count"] == 1 and \
+                any(previous.get(key) != current.get(key) for key in signature):
+            return "changed"
+        return None
+
+    def _store_baseline(self):
+        """Keep this passing run's preflight snapshot as the baseline for the next run"""
+        selectors = {s for step in self.test_data.get('steps', []) for s in step.get('selectors', [])}
+        self.test_data['baseline'] = {s: state for s, state in self._snapshot.items()
+                                      if s in selectors and "error" not in state}
+        self._save_test_data()
+
+    def _check_limits(self, page: Page, step_timeout: Optional[float]):
+        """Stop on cancellation or an expired deadline, else bound Playwright waits for the next step"""
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise TestCancelled("Test was cancelled")
+        seconds = step_timeout or DEFAULT_STEP_TIMEOUT
+        if self.deadline is not None:
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                raise TestDeadlineExceeded(f"Test exceeded its {self.test_data['timeout']}s timeout")
+            seconds = min(seconds, remaining)
+        page.set_default_timeout(seconds * 1000)
+
+    def _should_stop(self) -> bool:
+        """Whether a heal in progress should give up because the run was cancelled"""
+        return self.cancelled is not None and self.cancelled.is_set()
+
+    def _time_left(self) -> Optional[float]:
+        """Seconds until the step's or the test's deadline, whichever is sooner; None without either"""
+        deadlines = [d for d in (self._step_deadline, self.deadline) if d is not None]
+        return max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+    def _out_of_time(self, page: Page) -> bool:
+        """Raise on cancellation or an expired test deadline; True once the step's timeout is used up"""
+        left = self._time_left()
+        self._check_limits(page, left or None)
+        return left == 0
+
+    def _heal_timeout(self) -> Optional[float]:
+        """The healer's budget cut to what is left of the deadlines, or None without one"""
+        left = self._time_left()
+        return None if left is None else min(self.healer.heal_timeout, left)
+
+    def _finish_step(self, status: str, step_index: int, description: str,
+                     selector: Optional[str] = None) -> bool:
+        """Record a step outcome for the run report and announce it"""
+        self.step_results.append({"step": step_index, "description": description,
+                                  "status": status, "selector": selector})
+        self._emit(f"step_{status}", step=step_index, description=description,
+                   selector=selector)
+        return status != "failed"
     
     def _execute_step(self, page: Page, step: Dict, step_index: int) -> bool:
         """Execute a single test step with healing capability"""
         action = step.get('action')
-        selectors = step.get('selectors', [])
+        # Selectors the preflight predicted broken go last, so working ones are tried first
+        broken = self._predicted_broken.get(step_index, set())
+        selectors = [s for s in step.get('selectors', []) if s not in broken] + \
+                    [s for s in step.get('selectors', []) if s in broken]
+        # A pre-flight heal goes first, and is saved only if the step passes with it
+        preflight_heal = self._preflight_heals.get(step_index)
+        if preflight_heal:
+            selectors = [preflight_heal] + [s for s in selectors if s != preflight_heal]
         description = step.get('description', f"Step {step_index + 1}")
         
-        # Try each selector until one works
+        # Try each selector until one works. Healing starts in the background
+        # as soon as the primary selector misses, while fallbacks are probed;
+        # a fallback that works aborts the speculative Ollama request.
+        pending_heal = None
+        abort = AbortSignal()
         for selector in selectors:
+            if self._out_of_time(page):
+                break
             try:
-                success = self._perform_action(page, action, selector, step)
+                success = self._perform_action(page, action, selector, step, self._time_left())
                 if success:
-                    return True
+                    if pending_heal:
+                        abort.set()
+                        HEALS.inc(tier="fallback", outcome="success")
+                    if selector == preflight_heal:
+                        self.test_data['steps'][step_index]['selectors'].insert(0, selector)
+                        self._save_test_data()
+                        return self._finish_step("healed", step_index, description, selector)
+                    return self._finish_step("passed", step_index, description, selector)
             except Exception as e:
                 print(f"Selector failed: {selector} - {e}")
+                if pending_heal is None and self.heal:
+                    self._emit("heal_started", step=step_index, description=description,
+                               failed_selector=selector)
+                    pending_heal = self._start_heal(page, step, step_index, abort)
                 continue
         
-        # All selectors failed - try healing
+        if self._out_of_time(page):
+            abort.set()
+            print(f"Step ran out of time: {description}")
+            return self._finish_step("failed", step_index, description)
+        
+        # All selectors failed - finish healing
         print(f"All selectors failed for: {description}")
-        healed_selector = self._heal_step(page, step, step_index)
+        if not self.heal:
+            return self._finish_step("failed", step_index, description)
+        if pending_heal is None:
+            self._emit("heal_started", step=step_index, description=description,
+                       failed_selector=None)
+            pending_heal = self._start_heal(page, step, step_index)
+        healed_selector = self.healer.finish_healing(page, pending_heal, step,
+                                                     timeout=self._heal_timeout(),
+                                                     should_stop=self._should_stop)
+        if self._out_of_time(page):
+            print(f"Step ran out of time while healing: {description}")
+            return self._finish_step("failed", step_index, description)
         
         if healed_selector:
             try:
-                success = self._perform_action(page, action, healed_selector, step)
+                success = self._perform_action(page, action, healed_selector, step,
+                                               self._time_left())
                 if success:
                     # Update test data with healed selector
                     self.test_data['steps'][step_index]['selectors'].insert(0, healed_selector)
                     self._save_test_data()
                     print(f"✅ Healed selector: {healed_selector}")
-                    return True
+                    return self._finish_step("healed", step_index, description, healed_selector)
             except Exception as e:
                 print(f"Healed selector also failed: {e}")
         
-        return False
+        return self._finish_step("failed", step_index, description)
     
-    def _perform_action(self, page: Page, action: str, selector: str, step: Dict) -> bool:
-        """Perform the specified action on the element"""
-        element = page.locator(selector).first
+    def _perform_action(self, page: Page, action: str, selector: str, step: Dict,
+                        timeout: Optional[float] = None) -> bool:
+        """Perform the specified action on the element, waiting at most `timeout` seconds"""
+        element = resolve_locator(page, selector).first
+        # Playwright reads a timeout of 0 as no timeout at all
+        ms = max(1.0, timeout * 1000) if timeout is not None else None
         
         if action == 'click':
-            element.click()
+            element.click(timeout=ms)
         elif action == 'fill':
             text = step.get('text', '')
-            element.fill(text)
+            element.fill(text, timeout=ms)
         elif action == 'type':
             text = step.get('text', '')
-            element.type(text)
+            element.type(text, timeout=ms)
         elif action == 'wait':
-            element.wait_for()
+            element.wait_for(timeout=ms)
         elif action == 'assert_visible':
             assert element.is_visible()
         elif action == 'assert_text':
             expected_text = step.get('expected_text', '')
-            assert expected_text in element.text_content()
+            assert expected_text in element.text_content(timeout=ms)
         else:
             print(f"Unknown action: {action}")
             return False
             
         return True
     
-    def _heal_step(self, page: Page, step: Dict, step_index: int) -> str:
-        """Attempt to heal a failed step"""
+    def _start_heal(self, page: Page, step: Dict, step_index: int,
+                    abort: Optional[AbortSignal] = None) -> Future:
+        """Start healing a failed step in the background, abortable through `abort`"""
         failed_selectors = step.get('selectors', [])
         description = step.get('description', f"Step {step_index + 1}")
         
         # Use the first selector as the "failed" one for context
         primary_selector = failed_selectors[0] if failed_selectors else ""
         
-        return self.healer.heal_selector(
+        return self.healer.start_healing(
             page=page,
             failed_selector=primary_selector,
             step_description=description,
-            alternative_selectors=failed_selectors[1:] if len(failed_selectors) > 1 else None
+            alternative_selectors=failed_selectors[1:] if len(failed_selectors) > 1 else None,
+            abort=abort
         )
\ No newline at end of file